@@ -0,0 +1,51 @@
+"""
+Benchmark every available codec profile on one sample incident.
+
+    python -m benchmarks.bench_codecs <camera folder> [scale]
+
+The first incident (30 s gap grouping) with at least 2 frames is used.
+"""
+import os, sys
+from utils.config import IMAGE_EXTENSIONS
+from utils.image_index import image_timestamp, CameraFrames
+from utils.video_utils import benchmark_codecs, group_images_by_incident, probe_codecs
+import numpy as np
+
+# utils.logs redirects stdout into the log files
+out = sys.__stdout__
+
+
+def sample_incident(camera_folder):
+    rows = []
+    for root, _, files in os.walk(camera_folder):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                rows.append((image_timestamp(name, os.path.getmtime(path)), path))
+    rows.sort()
+    frames = CameraFrames([p for _, p in rows], np.array([t for t, _ in rows]),
+                          np.zeros(len(rows), dtype=np.int64))
+    for group in group_images_by_incident(list(frames.items()), gap_seconds=30):
+        if len(group) >= 2:
+            return group
+    return None
+
+
+def main(camera_folder, scale=1):
+    group = sample_incident(camera_folder)
+    if not group:
+        out.write(f"No incident found under {camera_folder}\n")
+        return
+    out.write(f"Available profiles: {', '.join(probe_codecs(force=True))}\n")
+    out.write(f"Sample incident: {len(group)} frames, scale 1/{scale}\n")
+    for name, seconds, size, ok in benchmark_codecs(group, scale=scale):
+        status = "ok" if ok else "FAILED"
+        out.write(f"  {name:<6} {seconds:7.2f} s  {size / 1e6:8.2f} MB  "
+                  f"{len(group) / seconds:7.1f} fps  {status}\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.__stderr__.write(__doc__)
+        sys.exit(2)
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 1)
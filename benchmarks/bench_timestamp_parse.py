@@ -0,0 +1,63 @@
+"""
+Microbenchmark: legacy regex + strptime timestamp parsing vs the fixed-layout
+fast path in utils.file_utils, on synthetic frame filenames.
+
+    python -m benchmarks.bench_timestamp_parse [count]
+"""
+import re, sys, time
+from datetime import datetime, timedelta
+from utils.file_utils import extract_timestamp_from_filename, parse_gmt_epoch, parse_gmt_epochs
+
+# utils.logs redirects stdout into the log files
+out = sys.__stdout__
+
+
+def legacy_extract(filename):
+    """The regex + strptime parser this benchmark replaces."""
+    m = re.search(r'_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(?:-\d{1,6})?)_GMT', filename)
+    if not m:
+        return None
+    ts_str = m.group(1)
+    fmt = "%Y-%m-%d_%H-%M-%S-%f" if '-' in ts_str and ts_str.count('-') >= 6 else "%Y-%m-%d_%H-%M-%S"
+    try:
+        return datetime.strptime(ts_str, fmt)
+    except Exception:
+        try:
+            return datetime.strptime(ts_str.split('-')[0:6].__repr__(), fmt)
+        except Exception:
+            return None
+
+
+def synthetic_names(count, with_fraction):
+    base = datetime(2025, 9, 26, 3, 0, 0)
+    names = []
+    for i in range(count):
+        t = base + timedelta(milliseconds=200 * i)
+        stamp = t.strftime("%Y-%m-%d_%H-%M-%S")
+        if with_fraction:
+            stamp += f"-{t.microsecond:06d}"
+        names.append(f"frame_{i}_{stamp}_GMT.jpg")
+    return names
+
+
+def timed(label, fn, names):
+    start = time.perf_counter()
+    fn(names)
+    elapsed = time.perf_counter() - start
+    out.write(f"  {label:<34} {elapsed * 1000:9.1f} ms  ({len(names) / elapsed / 1e3:8.1f} k names/s)\n")
+    return elapsed
+
+
+def main(count=100_000):
+    for with_fraction in (False, True):
+        names = synthetic_names(count, with_fraction)
+        out.write(f"{count} names, {'with' if with_fraction else 'without'} microseconds:\n")
+        legacy = timed("legacy regex + strptime", lambda n: [legacy_extract(x) for x in n], names)
+        timed("extract_timestamp_from_filename", lambda n: [extract_timestamp_from_filename(x) for x in n], names)
+        fast = timed("parse_gmt_epoch", lambda n: [parse_gmt_epoch(x) for x in n], names)
+        timed("parse_gmt_epochs (batch)", parse_gmt_epochs, names)
+        out.write(f"  speedup parse_gmt_epoch vs legacy: {legacy / fast:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
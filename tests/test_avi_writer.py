@@ -0,0 +1,66 @@
+import os
+import struct
+import cv2
+import numpy as np
+import pytest
+from utils.avi_writer import jpeg_dimensions, MjpegAviWriter
+
+
+def _jpeg(width, height, shade=128):
+    ok, data = cv2.imencode(".jpg", np.full((height, width, 3), shade, np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+def test_jpeg_dimensions_reads_the_sof_segment():
+    assert jpeg_dimensions(_jpeg(64, 48)) == (64, 48)
+    # Extra APPn segment and fill bytes ahead of the SOF
+    data = _jpeg(320, 240)
+    app = b"\xff\xe1" + struct.pack(">H", 6) + b"Exif"
+    assert jpeg_dimensions(data[:2] + b"\xff" + app + data[2:]) == (320, 240)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x89PNG\r\n\x1a\n", b"\xff\xd8", b"\xff\xd8\xff\xc0\x00\x11\x08",
+                                  b"\xff\xd8\xff\xda\x00\x02"])
+def test_jpeg_dimensions_rejects_other_data(data):
+    assert jpeg_dimensions(data) is None
+
+
+def test_writer_produces_an_indexed_avi(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    frames = [_jpeg(64, 48, shade) for shade in (0, 100, 200)]
+    if len(frames[0]) % 2 == 0:
+        frames[0] += b"\0"  # exercise chunk padding
+    writer = MjpegAviWriter(path, 5, 64, 48)
+    for data in frames:
+        writer.write(data)
+    writer.close()
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert len(raw) == writer.bytes_written
+    assert raw[:4] == b"RIFF" and struct.unpack_from("<I", raw, 4)[0] == len(raw) - 8
+    movi = raw.index(b"movi")
+    idx1 = raw.index(b"idx1", movi)
+    entries = [struct.unpack_from("<4sIII", raw, idx1 + 8 + 16 * i) for i in range(len(frames))]
+    for (fourcc, flags, offset, size), data in zip(entries, frames):
+        assert fourcc == b"00dc" and size == len(data)
+        assert raw[movi + offset + 8:movi + offset + 8 + size] == data
+
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            pytest.skip("this OpenCV build cannot read MJPEG AVI")
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == len(frames)
+        ok, frame = cap.read()
+        assert ok and frame.shape == (48, 64, 3)
+    finally:
+        cap.release()
+
+
+def test_abort_removes_the_partial_file(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = MjpegAviWriter(path, 5, 64, 48)
+    writer.write(_jpeg(64, 48))
+    writer.abort()
+    assert not os.path.exists(path)
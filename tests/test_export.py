@@ -0,0 +1,130 @@
+import numpy as np
+from utils.image_index import CameraFrames
+from utils.segmentation import SegmentPolicy, incident_summaries
+from utils.export import plan_export, incident_tasks
+
+POLICY = SegmentPolicy(gap_seconds=30, min_frames=2, max_duration=900, merge_across_hours=True)
+HOUR = "10:00AM - 11:00AM"
+
+
+def _frames(ts):
+    ts = np.asarray(ts, dtype=np.float64)
+    return CameraFrames([f"/cam/{t:.0f}.jpg" for t in ts], ts, np.zeros(len(ts), np.int64))
+
+
+def test_chosen_clips_survive_frames_arriving_after_the_preview():
+    base = 1758862800.0
+    incidents = [base + np.arange(0, 20, 5), base + 60 + np.arange(0, 20, 5), base + 200 + np.arange(0, 20, 5)]
+    previewed = incident_summaries(_frames(np.concatenate(incidents)), POLICY)
+    assert [i.number for i in previewed] == [1, 2, 3]
+
+    # A late frame closes the gap between incidents 1 and 2 before the export runs
+    late = _frames(np.sort(np.concatenate(incidents + [[base + 40]])))
+    assert len(incident_summaries(late, POLICY)) == 2
+
+    units = plan_export([("Front", HOUR, late)], "/out", POLICY, chosen={("Front", HOUR): [previewed[2]]})
+    ((_, group, out_path),) = incident_tasks(units, ".avi")
+    assert [path for path, _ in group] == [f"/cam/{t:.0f}.jpg" for t in incidents[2]]
+    assert "/incident_3_" in out_path
+
+
+def test_failed_write_on_a_missing_device_stops_the_export(tmp_path, monkeypatch):
+    import threading
+    import utils.export as export
+    calls = []
+    monkeypatch.setattr(export, "export_video", lambda group, out_path, **kw: calls.append(out_path)
+                        or (False, "No such file or directory"))
+    monkeypatch.setattr(export, "get_free_space_bytes", lambda device: 1 << 40)
+    device = str(tmp_path / "unplugged")
+    tasks = [(i, [(f"/cam/{i}.jpg", 0.0)], f"{device}/incident_{i}.avi") for i in (1, 2, 3)]
+    abort = threading.Event()
+    saved, failures, out_of_space = export.encode_incidents(tasks, device, abort, workers=1,
+                                                            staging=None)
+    assert abort.is_set()
+    assert len(calls) == 1 and len(failures) == 1 and saved == [] and out_of_space is None
+
+
+def test_same_file_names_in_different_hours_are_staged_apart(tmp_path, monkeypatch):
+    import os
+    import threading
+    import utils.export as export
+    staged = []
+
+    def fake_export(group, out_path, **kw):
+        staged.append(out_path)
+        with open(out_path, "w") as f:
+            f.write(group[0][0])
+        return True, None
+
+    monkeypatch.setattr(export, "export_video", fake_export)
+    monkeypatch.setattr(export, "STAGING_DIR", str(tmp_path))
+    folders = [tmp_path / "10AM", tmp_path / "11AM"]
+    for folder in folders:
+        folder.mkdir()
+    tasks = [(i, [(f"/cam/{i}.jpg", 0.0)], str(folder / "incident_1.avi"))
+             for i, folder in enumerate(folders, start=1)]
+    saved, failures, _ = export.encode_incidents(tasks, str(tmp_path), threading.Event(), workers=1)
+    assert len(set(staged)) == 2 and not failures
+    assert [open(path).read() for path in saved] == ["/cam/1.jpg", "/cam/2.jpg"]
+    assert not any(os.path.exists(path) for path in staged)
+
+
+def _saved_video(folder, name, content=b"video-bytes", srt=False):
+    from utils.export import ExportManifest, file_sha256
+    from utils.video_utils import srt_path_for
+    path = str(folder / name)
+    with open(path, "wb") as f:
+        f.write(content)
+    if srt:
+        with open(srt_path_for(path), "w") as f:
+            f.write("1\n")
+    manifest = ExportManifest.load(str(folder))
+    manifest.record(path, 4, len(content), file_sha256(path))
+    return path
+
+
+def test_manifest_verify_catches_changed_or_missing_output(tmp_path):
+    import os
+    from utils.export import ExportManifest
+    from utils.video_utils import srt_path_for
+    intact = _saved_video(tmp_path, "incident_1.avi")
+    truncated = _saved_video(tmp_path, "incident_2.avi")
+    swapped = _saved_video(tmp_path, "incident_3.avi")
+    no_srt = _saved_video(tmp_path, "incident_4.avi", srt=True)
+    deleted = _saved_video(tmp_path, "incident_5.avi")
+    with open(truncated, "wb") as f:
+        f.write(b"video")
+    with open(swapped, "wb") as f:
+        f.write(b"VIDEO-BYTES")  # same size, different content
+    os.remove(srt_path_for(no_srt))
+    os.remove(deleted)
+
+    manifest = ExportManifest.load(str(tmp_path))  # reloaded from disk
+    assert manifest.verify(intact, 4)
+    assert not manifest.verify(intact, 5)  # the incident gained frames since
+    for path in (truncated, swapped, no_srt, deleted, str(tmp_path / "incident_6.avi")):
+        assert not manifest.verify(path, 4)
+
+
+def test_unreadable_manifest_means_nothing_is_saved(tmp_path):
+    from utils.export import ExportManifest, MANIFEST_NAME
+    (tmp_path / MANIFEST_NAME).write_text("{not json")
+    assert ExportManifest.exists(str(tmp_path))
+    assert ExportManifest.load(str(tmp_path)).entries == {}
+
+
+def test_split_resumable_keeps_only_unverified_tasks(tmp_path):
+    from utils.export import split_resumable
+    hours = [tmp_path / "10AM", tmp_path / "11AM"]
+    for folder in hours:
+        folder.mkdir()
+    done = _saved_video(hours[0], "incident_1.avi")
+    (hours[1] / "incident_1.avi.part").write_bytes(b"half")
+    group = [(f"/cam/{i}.jpg", None) for i in range(4)]
+    tasks = [(1, group, done), (2, group, str(hours[0] / "incident_2.avi")),
+             (3, group, str(hours[1] / "incident_1.avi"))]
+
+    manifests, saved, remaining = split_resumable(tasks, [str(h) for h in hours])
+    assert saved == tasks[:1] and remaining == tasks[1:]
+    assert set(manifests) == {str(h) for h in hours}
+    assert not (hours[1] / "incident_1.avi.part").exists()
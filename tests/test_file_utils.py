@@ -0,0 +1,58 @@
+import calendar
+from datetime import datetime
+import numpy as np
+import pytest
+from utils.file_utils import parse_gmt_epoch, parse_gmt_epochs, extract_timestamp_from_filename
+
+
+def _epoch(*args):
+    return calendar.timegm(datetime(*args).timetuple())
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("cam1_2024-05-01_10-20-30-123456_GMT.jpg", _epoch(2024, 5, 1, 10, 20, 30) + 0.123456),
+    ("cam1_2024-05-01_10-20-30_GMT.jpg", _epoch(2024, 5, 1, 10, 20, 30)),
+    ("cam1_2024-05-01_10-20-30-5_GMT.jpg", _epoch(2024, 5, 1, 10, 20, 30) + 0.5),
+    ("cam1_2024-05-01_10-20-30-012_GMT.jpg", _epoch(2024, 5, 1, 10, 20, 30) + 0.012),
+    ("2024-02-29_23-59-59_GMT.jpg", None),  # nothing before the timestamp: no leading "_"
+    ("x_2024-02-29_23-59-59_GMT.jpg", _epoch(2024, 2, 29, 23, 59, 59)),
+    ("a_GMT_b_2024-05-01_00-00-00_GMT.jpg", _epoch(2024, 5, 1)),  # first "_GMT" is not a timestamp
+])
+def test_parses_the_fixed_layout(name, expected):
+    parsed = parse_gmt_epoch(name)
+    if expected is None:
+        assert parsed is None
+    else:
+        assert parsed == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize("name", [
+    "cam1_2023-02-29_10-00-00_GMT.jpg",         # not a leap year
+    "cam1_2024-13-01_10-00-00_GMT.jpg",         # month 13
+    "cam1_2024-04-31_10-00-00_GMT.jpg",         # April has 30 days
+    "cam1_2024-05-01_24-00-00_GMT.jpg",         # hour 24
+    "cam1_2024-05-01_10-60-00_GMT.jpg",
+    "cam1_2024-05-01_10-00-60_GMT.jpg",
+    "cam1_2024-05-01_10-00-00-1234567_GMT.jpg",  # 7-digit fraction
+    "cam1_2024-05-01_10-00-00-_GMT.jpg",        # empty fraction
+    "cam1_2024-05-01_1a-00-00_GMT.jpg",
+    "cam1_2024-05-01_10-00-00.jpg",             # no _GMT
+    "cam1_2024-05-01_１０-00-00_GMT.jpg",        # non-ASCII digits
+])
+def test_rejects_malformed_timestamps(name):
+    assert parse_gmt_epoch(name) is None
+    assert extract_timestamp_from_filename(name) is None
+
+
+def test_datetime_and_batch_parsers_agree():
+    names = ["cam_2024-05-01_10-20-30-000250_GMT.jpg", "cam_2024-05-01_24-00-00_GMT.jpg",
+             "cam_2024-12-31_23-59-59-9_GMT.jpg"]
+    epochs = parse_gmt_epochs(names)
+    assert np.isnan(epochs[1])
+    for name, epoch in zip(names, epochs):
+        dt = extract_timestamp_from_filename(name)
+        if dt is None:
+            assert np.isnan(epoch)
+        else:
+            assert calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6 == pytest.approx(epoch)
+    assert extract_timestamp_from_filename(names[0]).microsecond == 250
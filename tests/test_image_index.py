@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from utils.image_index import iter_incident_ranges
+from utils.video_utils import group_images_by_incident
+
+
+def _legacy_groups(images_with_times, gap_seconds=30):
+    """The per-item grouping loop group_images_by_incident replaced."""
+    groups, current, last_t = [], [], None
+    for img_path, ts in sorted(images_with_times, key=lambda x: x[1]):
+        if not last_t or (ts - last_t).total_seconds() > gap_seconds:
+            if current:
+                groups.append(current)
+            current = [(img_path, ts)]
+        else:
+            current.append((img_path, ts))
+        last_t = ts
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _legacy_ranges(ts, gap_seconds):
+    ranges, start = [], 0
+    for i in range(1, len(ts)):
+        if ts[i] - ts[i - 1] > gap_seconds:
+            ranges.append((start, i))
+            start = i
+    return ranges + ([(start, len(ts))] if len(ts) else [])
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("chunk", [1, 3, 64, 65536])
+def test_ranges_match_the_per_frame_loop(seed, chunk):
+    rng = np.random.default_rng(seed)
+    # Mostly 0.2-5 s spacing with occasional long pauses, some exactly at the gap
+    steps = rng.choice([0.2, 1.0, 5.0, 30.0, 31.0, 600.0], size=int(rng.integers(0, 400)),
+                       p=[0.4, 0.3, 0.2, 0.04, 0.03, 0.03])
+    ts = 1_700_000_000 + np.cumsum(steps)
+    expected = _legacy_ranges(ts.tolist(), 30)
+    assert list(iter_incident_ranges(ts, 30, chunk=chunk)) == expected
+    assert list(iter_incident_ranges(iter(ts.tolist()), 30, chunk=chunk)) == expected
+
+
+def test_edge_cases():
+    assert list(iter_incident_ranges(np.array([]), 30)) == []
+    assert list(iter_incident_ranges(np.array([5.0]), 30)) == [(0, 1)]
+    assert list(iter_incident_ranges(np.array([0.0, 30.0, 60.0]), 30)) == [(0, 3)]  # gap is inclusive
+    assert list(iter_incident_ranges(np.array([0.0, 30.5, 61.0]), 30)) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_group_images_by_incident_matches_the_old_grouping():
+    rng = np.random.default_rng(7)
+    base = datetime(2024, 5, 1, 10)
+    offsets = np.cumsum(rng.choice([0.2, 1.0, 29.999999, 30.0, 30.000001, 120.0], size=300))
+    items = [(f"/cam/{i}.jpg", base + timedelta(seconds=float(s))) for i, s in enumerate(offsets)]
+    rng.shuffle(items)
+    assert group_images_by_incident(items, 30) == _legacy_groups(items, 30)
+    assert group_images_by_incident([], 30) == []
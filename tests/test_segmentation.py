@@ -0,0 +1,83 @@
+from datetime import datetime
+import numpy as np
+from utils.image_index import CameraFrames, ist_to_epoch
+from utils.segmentation import SegmentPolicy, select_hours
+
+POLICY = SegmentPolicy(gap_seconds=30, min_frames=2, max_duration=900, merge_across_hours=True)
+
+
+def _frames(ts):
+    ts = np.asarray(ts, dtype=np.float64)
+    return CameraFrames([f"/cam/{i}.jpg" for i in range(len(ts))], ts, np.zeros(len(ts), np.int64))
+
+
+def _hour(h):
+    start = ist_to_epoch(datetime(2025, 9, 26, h))
+    return start, start + 3600
+
+
+def test_continuous_activity_stays_in_its_hours():
+    # One frame every 5 s from 10:00 to 12:30 IST
+    start = ist_to_epoch(datetime(2025, 9, 26, 10))
+    frames = _frames(np.arange(start, start + 9000, 5.0))
+    selected = select_hours(frames, [_hour(10), _hour(11), _hour(12)], POLICY)
+    assert [len(s) for s in selected] == [720, 720, 360]
+    assert sum(len(s) for s in selected) == len(frames)
+
+
+def test_later_hour_alone_keeps_its_footage():
+    start = ist_to_epoch(datetime(2025, 9, 26, 10))
+    frames = _frames(np.arange(start, start + 9000, 5.0))
+    (eleven,) = select_hours(frames, [_hour(11)], POLICY)
+    assert len(eleven) == 720
+    assert eleven.ts[0] == _hour(11)[0]
+
+
+def test_short_incident_over_the_hour_edge_goes_to_its_start_hour():
+    edge = _hour(11)[0]
+    ts = [edge - 3000, edge - 2995] + [edge - 10 + 5 * i for i in range(7)] + [edge + 600, edge + 605]
+    frames = _frames(ts)
+    ten, eleven = select_hours(frames, [_hour(10), _hour(11)], POLICY)
+    assert len(ten) == 9 and ten.ts[-1] == edge + 20
+    assert list(eleven.ts) == [edge + 600, edge + 605]
+    # Exported on its own, 11:00 keeps the tail of the 10:59 incident
+    (alone,) = select_hours(frames, [_hour(11)], POLICY)
+    assert len(alone) == 7
+
+
+def test_without_merge_hours_are_plain_ranges():
+    edge = _hour(11)[0]
+    frames = _frames([edge - 10, edge - 5, edge, edge + 5])
+    ten, eleven = select_hours(frames, [_hour(10), _hour(11)], POLICY._replace(merge_across_hours=False))
+    assert (len(ten), len(eleven)) == (2, 2)
+
+
+def test_max_duration_zero_means_never_split():
+    from utils.segmentation import policy_for
+    policy = policy_for("Front", max_duration=0)
+    assert policy.max_duration is None
+    edge = _hour(11)[0]
+    frames = _frames([edge - 10 + 5 * i for i in range(7)])
+    ten, _ = select_hours(frames, [_hour(10), _hour(11)], policy)
+    assert len(ten) == 7
+
+
+def test_invalid_policy_is_rejected_and_ranges_are_never_empty():
+    import pytest
+    from utils.cli import build_parser
+    from utils.segmentation import policy_for, segment_ranges
+    with pytest.raises(ValueError):
+        policy_for("Front", min_frames=0)
+    with pytest.raises(ValueError):
+        policy_for("Front", max_duration=-5)
+    for option in (["--min-frames", "0"], ["--max-duration", "-1"]):
+        with pytest.raises(SystemExit) as exit_info:
+            build_parser().parse_args(["segments", "--camera", "Front", "--from", "2024-05-01",
+                                       "--to", "2024-05-02"] + option)
+        assert exit_info.value.code == 2
+    # max_duration far below the frame spacing used to yield (i, i) ranges
+    ts = np.array([0, 0.5, 1, 1, 1, 2], dtype=np.float64) * 10
+    policy = SegmentPolicy(gap_seconds=30, min_frames=1, max_duration=0.5, merge_across_hours=True)
+    ranges = segment_ranges(ts, policy)
+    assert all(b > a for a, b in ranges)
+    assert sum(b - a for a, b in ranges) == len(ts)
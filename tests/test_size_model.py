@@ -0,0 +1,61 @@
+import json
+import pytest
+from utils.size_model import (
+    SizeModel, PRIOR_RATIOS, SAFETY_MARGIN, LEARNING_RATE, MIN_INPUT_BYTES
+)
+
+MB = 1024 * 1024
+
+
+def test_priors_scale_with_pixel_count_except_passthrough(tmp_path):
+    model = SizeModel(str(tmp_path / "model.json"))
+    assert model.ratio("Front", "mp4v", 1) == (PRIOR_RATIOS["mp4v"], False)
+    assert model.ratio("Front", "mp4v", 2) == (PRIOR_RATIOS["mp4v"] / 4, False)
+    assert model.ratio("Front", "passthrough", 4) == (PRIOR_RATIOS["passthrough"], False)
+
+
+def test_observations_are_averaged_persisted_and_kept_apart(tmp_path):
+    path = str(tmp_path / "model.json")
+    model = SizeModel(path)
+    model.observe("Front", "mp4v", 1, 10 * MB, 2 * MB)
+    assert model.ratio("Front", "mp4v", 1) == pytest.approx((0.2 * SAFETY_MARGIN, True))
+    model.observe("Front", "mp4v", 1, 10 * MB, 4 * MB)
+    expected = 0.2 + LEARNING_RATE * (0.4 - 0.2)
+    assert model.ratio("Front", "mp4v", 1)[0] == pytest.approx(expected * SAFETY_MARGIN)
+
+    # Other camera, codec and scale still use their priors
+    for camera, codec, scale in (("Rear", "mp4v", 1), ("Front", "mjpg", 1), ("Front", "mp4v", 2)):
+        assert model.ratio(camera, codec, scale)[1] is False
+
+    reloaded = SizeModel(path)
+    assert reloaded.ratios[SizeModel.key("Front", "mp4v", 1)] == {"ratio": pytest.approx(expected),
+                                                                 "samples": 2}
+
+
+def test_tiny_or_failed_exports_are_not_learned(tmp_path):
+    model = SizeModel(str(tmp_path / "model.json"))
+    model.observe("Front", "mp4v", 1, MIN_INPUT_BYTES - 1, MB)
+    model.observe("Front", "mp4v", 1, 10 * MB, 0)
+    assert model.ratios == {}
+    assert not (tmp_path / "model.json").exists()
+
+
+def test_corrupt_model_file_starts_from_priors(tmp_path):
+    path = tmp_path / "model.json"
+    path.write_text("{oops")
+    assert SizeModel(str(path)).ratios == {}
+
+
+def test_sizer_uses_indexed_sizes_and_learns_from_them(tmp_path):
+    model = SizeModel(str(tmp_path / "model.json"))
+    on_disk = tmp_path / "b.jpg"
+    on_disk.write_bytes(b"x" * 1000)
+    group = [("/cam/a.jpg", 0.0), (str(on_disk), 1.0), ("/cam/missing.jpg", 2.0)]
+    sizer = model.sizer("Front", "mp4v", 1, {"/cam/a.jpg": 2 * MB})
+    assert sizer.input_bytes(group) == 2 * MB + 1000  # unindexed paths are stat'ed, missing ones count 0
+    assert sizer.estimate([]) == 0
+    prior_estimate = sizer.estimate(group)
+
+    sizer.observe(group, (2 * MB + 1000) // 10)
+    assert sizer.estimate(group) < prior_estimate
+    assert json.loads((tmp_path / "model.json").read_text())["Front|mp4v|1"]["samples"] == 1
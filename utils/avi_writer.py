@@ -0,0 +1,121 @@
+import os, struct
+
+AVIF_HASINDEX = 0x10
+AVIIF_KEYFRAME = 0x10
+# Plain RIFF AVI (no OpenDML): keep well under the 2 GB RIFF limit
+AVI_MAX_BYTES = 1 << 30
+
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_dimensions(data):
+    """Return (width, height) from a JPEG's SOF segment, or None if data is not a JPEG."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos, end = 2, len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = struct.unpack_from(">H", data, pos + 2)[0]
+        if marker in _SOF_MARKERS:
+            if pos + 9 > end:
+                return None
+            height, width = struct.unpack_from(">HH", data, pos + 5)
+            return width, height
+        if marker == 0xDA:  # start of scan before any SOF
+            return None
+        pos += 2 + length
+    return None
+
+
+class MjpegAviWriter:
+    """
+    Writes already-compressed JPEG frames into an MJPEG AVI without decoding.
+
+    Frames are appended as '00dc' chunks; the header counts, the movi size and
+    the idx1 index are filled in by close(). All frames must share the size
+    given to the constructor.
+    """
+
+    _HEADER_SIZE = 12 + 12 + 8 + 56 + 12 + 8 + 56 + 8 + 40 + 12  # up to the first movi chunk
+
+    def __init__(self, path, fps, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        # Fractional rates as dwRate/dwScale
+        self.rate, self.scale = int(round(fps * 1000)), 1000
+        self.micro_sec_per_frame = int(round(1e6 / fps))
+        self._index = []  # (offset from 'movi', size)
+        self._max_frame = 0
+        self._movi_bytes = 4  # 'movi' fourcc
+        self._f = open(path, "wb")
+        self._f.write(self._header())
+
+    @property
+    def frames(self):
+        return len(self._index)
+
+    @property
+    def bytes_written(self):
+        return self._HEADER_SIZE - 4 + self._movi_bytes + 8 + 16 * len(self._index)
+
+    def write(self, jpeg_bytes):
+        size = len(jpeg_bytes)
+        if self.bytes_written + size + 24 > AVI_MAX_BYTES:
+            raise OSError(f"AVI size limit reached ({AVI_MAX_BYTES // (1024*1024)} MB)")
+        self._index.append((self._movi_bytes, size))
+        self._f.write(b"00dc" + struct.pack("<I", size) + jpeg_bytes)
+        if size & 1:
+            self._f.write(b"\0")
+        self._movi_bytes += 8 + size + (size & 1)
+        self._max_frame = max(self._max_frame, size)
+
+    def close(self):
+        """Write the index, patch the header and close the file."""
+        if self._f is None:
+            return
+        f, self._f = self._f, None
+        try:
+            f.write(b"idx1" + struct.pack("<I", 16 * len(self._index)))
+            f.write(b"".join(struct.pack("<4sIII", b"00dc", AVIIF_KEYFRAME, offset, size)
+                             for offset, size in self._index))
+            f.seek(0)
+            f.write(self._header())
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+
+    def abort(self):
+        """Close without finalizing and remove the partial file."""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _header(self):
+        w, h, frames = self.width, self.height, len(self._index)
+        buf_size = self._max_frame + 8
+        avih = struct.pack("<IIIIIIIIII16x", self.micro_sec_per_frame, 0, 0, AVIF_HASINDEX,
+                           frames, 0, 1, buf_size, w, h)
+        strh = struct.pack("<4s4sIHHIIIIIIIIhhhh", b"vids", b"MJPG", 0, 0, 0, 0,
+                           self.scale, self.rate, 0, frames, buf_size, 0xFFFFFFFF, 0,
+                           0, 0, w, h)
+        strf = struct.pack("<IiiHH4sIiiII", 40, w, h, 1, 24, b"MJPG", w * h * 3, 0, 0, 0, 0)
+        strl = (b"strh" + struct.pack("<I", len(strh)) + strh
+                + b"strf" + struct.pack("<I", len(strf)) + strf)
+        hdrl = (b"hdrl" + b"avih" + struct.pack("<I", len(avih)) + avih
+                + b"LIST" + struct.pack("<I", 4 + len(strl)) + b"strl" + strl)
+        riff_size = 4 + 8 + len(hdrl) + 8 + self._movi_bytes + 8 + 16 * len(self._index)
+        return (b"RIFF" + struct.pack("<I", riff_size) + b"AVI "
+                + b"LIST" + struct.pack("<I", len(hdrl)) + hdrl
+                + b"LIST" + struct.pack("<I", self._movi_bytes) + b"movi")
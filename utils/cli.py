@@ -0,0 +1,236 @@
+"""
+Headless entry point: export incidents without the Kivy UI.
+
+    python main.py export --camera Front --from "2025-09-26 09:00" --to "2025-09-26 17:00" \
+        --dest /media/usb
+    python main.py segments --camera Front --from 2025-08-01 --to 2025-09-01 --gap 20
+    python main.py codecs
+
+Times are IST, like the UI. Nothing here imports Kivy, so it runs on machines
+without a display (cron jobs, benchmarks).
+"""
+import os, sys, argparse
+from datetime import datetime, timedelta
+from utils.config import (
+    LOCAL_PROJECT_ROOT, EXPORT_MODE, EXPORT_SCALE, EXPORT_PRESET, EXPORT_WORKERS
+)
+from utils.logs import logger
+from utils.image_index import get_image_index, ist_to_epoch
+from utils.file_utils import get_camera_folders
+from utils.video_utils import IMREAD_FLAGS, CODEC_PRESETS, probe_codecs, select_codec
+from utils.export import hour_label_for
+from utils.segmentation import policy_for, segment_stats, select_hours
+from utils.export_job import ExportJob, Planned, Progress, SpaceShort, FoldersExist
+
+# Exit codes
+EXIT_OK, EXIT_FAILED, EXIT_USAGE = 0, 1, 2
+
+
+def _ist_datetime(value):
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"expected 'YYYY-MM-DD HH:MM' (IST), got {value!r}")
+
+
+def _at_least_one(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def _not_negative(value):
+    number = float(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
+
+
+def _add_policy_arguments(parser):
+    """Segmentation overrides; unset options keep the camera's configured policy."""
+    parser.add_argument("--gap", type=float, help="seconds of silence that end an incident")
+    parser.add_argument("--min-frames", type=_at_least_one, help="drop incidents with fewer frames")
+    parser.add_argument("--max-duration", type=_not_negative,
+                        help="split incidents longer than this many seconds (0: never)")
+
+
+def _policy(args, camera):
+    return policy_for(camera, gap_seconds=args.gap, min_frames=args.min_frames,
+                      max_duration=args.max_duration)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Incident export without the UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="export the incidents of a camera for a time range")
+    exp.add_argument("--camera", required=True, help="camera name as shown in the UI (or folder name)")
+    exp.add_argument("--from", dest="start", required=True, type=_ist_datetime, help="IST start")
+    exp.add_argument("--to", dest="end", required=True, type=_ist_datetime, help="IST end (exclusive)")
+    exp.add_argument("--dest", required=True, help="device mount point (or any folder)")
+    exp.add_argument("--root", default=LOCAL_PROJECT_ROOT, help="camera root folder")
+    exp.add_argument("--mode", choices=("encode", "passthrough"), default=EXPORT_MODE)
+    exp.add_argument("--preset", choices=sorted(CODEC_PRESETS), default=EXPORT_PRESET)
+    exp.add_argument("--scale", type=int, choices=sorted(IMREAD_FLAGS), default=EXPORT_SCALE)
+    exp.add_argument("--workers", type=int, default=EXPORT_WORKERS)
+    _add_policy_arguments(exp)
+    existing = exp.add_mutually_exclusive_group()
+    existing.add_argument("--overwrite", action="store_true", help="replace folders that already exist")
+    existing.add_argument("--resume", action="store_true", help="keep verified incidents, export the rest")
+
+    seg = sub.add_parser("segments", help="preview how a segmentation policy splits a time range")
+    seg.add_argument("--camera", required=True, help="camera name as shown in the UI (or folder name)")
+    seg.add_argument("--from", dest="start", required=True, type=_ist_datetime, help="IST start")
+    seg.add_argument("--to", dest="end", required=True, type=_ist_datetime, help="IST end (exclusive)")
+    seg.add_argument("--root", default=LOCAL_PROJECT_ROOT, help="camera root folder")
+    _add_policy_arguments(seg)
+
+    sub.add_parser("codecs", help="probe which codec profiles this OpenCV build can write")
+    return parser
+
+
+def _resolve_camera(root, camera):
+    names, camera_map = get_camera_folders(root)
+    if camera_map is None:
+        return None, None
+    if camera in camera_map:
+        return camera, os.path.join(root, camera_map[camera])
+    for clean, real in camera_map.items():
+        if real == camera:
+            return clean, os.path.join(root, real)
+    return None, None
+
+
+def _hour_selections(camera, frames, start, end, policy):
+    """{IST date: [(camera, hour label, frames)]} for the hours touched by [start, end)."""
+    hours, bounds = [], []
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        hours.append(hour)
+        bounds.append((ist_to_epoch(max(hour, start)), ist_to_epoch(min(hour + timedelta(hours=1), end))))
+        hour += timedelta(hours=1)
+    by_date = {}
+    for hour, hour_frames in zip(hours, select_hours(frames, bounds, policy)):
+        if len(hour_frames):
+            by_date.setdefault(hour.strftime("%Y-%m-%d"), []).append(
+                (camera, hour_label_for(hour), hour_frames))
+    return by_date
+
+
+def _camera_frames(args, out):
+    """(camera, CameraFrames) for args.camera after an index refresh, or (None, None)."""
+    if args.end <= args.start:
+        out.write("--to must be after --from\n")
+        return None, None
+    camera, camera_path = _resolve_camera(args.root, args.camera)
+    if camera_path is None:
+        out.write(f"Camera {args.camera!r} not found under {args.root}\n")
+        return None, None
+    index = get_image_index()
+    added, removed = index.refresh(camera_path)
+    logger.info("CLI index refresh for %s: +%d -%d", camera_path, added, removed)
+    return camera, index.frames(camera_path)
+
+
+def run_export(args, out):
+    if not os.path.isdir(args.dest):
+        out.write(f"Destination {args.dest} does not exist\n")
+        return EXIT_USAGE
+    camera, frames = _camera_frames(args, out)
+    if frames is None:
+        return EXIT_USAGE
+
+    policy = _policy(args, camera)
+    job = ExportJob(args.dest, _hour_selections(camera, frames, args.start, args.end, policy),
+                    mode=args.mode, preset=args.preset, scale=args.scale, workers=args.workers,
+                    policy=policy, resume=args.resume, overwrite=args.overwrite)
+
+    def on_event(event):
+        if isinstance(event, Planned):
+            out.write(f"{camera}: {len(event.tasks)} incident(s) in {len(event.units)} hour folder(s)"
+                      + (f", {len(event.already_saved)} already saved" if event.already_saved else "")
+                      + "\n")
+        elif isinstance(event, Progress):
+            speed = f" ({event.mb_per_s:.1f} MB/s to device)" if event.mb_per_s else ""
+            out.write(f"  {event.done}/{event.total} done{speed}\n")
+        elif isinstance(event, SpaceShort):
+            out.write(f"Not enough space: need ~{event.required // (1024*1024)} MB, "
+                      f"have ~{event.free // (1024*1024)} MB\n")
+        elif isinstance(event, FoldersExist):
+            out.write(f"{len(event.folders)} folder(s) already have incidents "
+                      f"(use --overwrite or --resume):\n")
+            out.writelines(f"  {folder}\n" for folder in event.folders)
+        out.flush()
+
+    job.subscribe(on_event)
+    try:
+        result = job.run()
+    except KeyboardInterrupt:
+        job.cancel()
+        raise
+
+    if result.status in ("no_images", "no_incidents"):
+        out.write("No incidents found.\n")
+        return EXIT_OK
+    if result.status == "error":
+        out.write(f"Export failed: {result.error}\n")
+        return EXIT_FAILED
+    if result.status == "device_lost":
+        out.write(f"Destination {args.dest} disconnected; "
+                  f"{len(result.saved_files)} incident(s) were saved (use --resume)\n")
+        return EXIT_FAILED
+    if result.status != "done":
+        return EXIT_FAILED
+
+    for idx, out_path, error_msg in result.failures:
+        out.write(f"FAILED {out_path}: {error_msg}\n")
+    if result.out_of_space:
+        idx, required, free = result.out_of_space
+        out.write(f"Out of space at incident {idx}: need ~{required // (1024*1024)} MB, "
+                  f"have ~{free // (1024*1024)} MB\n")
+    out.write(f"Saved {len(result.saved_files)} incident(s) under "
+              f"{os.path.join(args.dest, 'Cognitica AI')}\n")
+    return EXIT_FAILED if result.failures or result.out_of_space else EXIT_OK
+
+
+def run_segments(args, out):
+    camera, frames = _camera_frames(args, out)
+    if frames is None:
+        return EXIT_USAGE
+    policy = _policy(args, camera)
+    frames = frames.between(ist_to_epoch(args.start), ist_to_epoch(args.end))
+    stats = segment_stats(frames.ts, policy)
+    max_clip = f"{policy.max_duration:g}s" if policy.max_duration else "unlimited"
+    out.write(f"{camera}: gap {policy.gap_seconds:g}s, min {policy.min_frames} frame(s), "
+              f"max clip {max_clip}\n")
+    out.write(f"  {stats['frames']} frames → {stats['incidents']} incident(s) → "
+              f"{stats['clips']} clip(s), {stats['dropped_frames']} frame(s) dropped\n")
+    if stats["clips"]:
+        out.write(f"  clip length: median {stats['duration_median']:.0f}s, "
+                  f"p95 {stats['duration_p95']:.0f}s, max {stats['duration_max']:.0f}s\n")
+    return EXIT_OK
+
+
+def run_codecs(args, out):
+    available = probe_codecs(force=True)
+    for preset in sorted(CODEC_PRESETS):
+        out.write(f"{preset:<9} → {select_codec(preset).name}\n")
+    out.write(f"available: {', '.join(available) or 'none'}\n")
+    return EXIT_OK if available else EXIT_FAILED
+
+
+COMMANDS = {"export": run_export, "segments": run_segments, "codecs": run_codecs}
+
+
+def main(argv):
+    # utils.logs routes stdout/stderr into the log files; a CLI wants the terminal
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    args = build_parser().parse_args(argv)
+    try:
+        return COMMANDS[args.command](args, sys.stdout)
+    except KeyboardInterrupt:
+        sys.stdout.write("Interrupted\n")
+        return EXIT_FAILED
@@ -1,8 +1,6 @@
 
 import sys, os, logging
 from datetime import timedelta
-from kivy.utils import get_color_from_hex
-from kivy.core.text import LabelBase
 
 # Figure out base path (development vs PyInstaller bundle)
 def get_base_dir():
@@ -13,17 +11,69 @@ def get_base_dir():
 BASE_DIR = get_base_dir()
 RESOURCES_DIR = os.path.join(BASE_DIR, "resources")
 
+# Writable app dir (next to the exe when frozen; _MEIPASS is a temp dir)
+def get_app_dir():
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_DIR = get_app_dir()
+CACHE_DIR = os.path.join(APP_DIR, "cache")
+
 # Paths
 LOCAL_PROJECT_ROOT = os.path.join(os.path.expanduser("~"), "project", "forklift_temp_rect")
 IST_OFFSET = timedelta(hours=5, minutes=30)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
 
-# Font
-arial_path = os.path.join(RESOURCES_DIR, "arial.ttf")
-if os.path.exists(arial_path):
-    LabelBase.register(name="Arial", fn_regular=arial_path)
+# Persistent image index (path, GMT timestamp, size, mtime per image)
+INDEX_DB_PATH = os.path.join(CACHE_DIR, "image_index.sqlite3")
+WATCH_POLL_INTERVAL = 5.0  # seconds, when inotify is unavailable
+
+# Device discovery (mount-table events; polling only as a fallback)
+DEVICE_POLL_INTERVAL = 2.0  # seconds
+MOUNT_DEBOUNCE = 0.3        # seconds to wait after a mount-table change
+DEVICE_CHECK_INTERVAL = 2.0 # export-device safety check while exporting (0 = events only)
 
-# Colors
-BG_COLOR = get_color_from_hex("#ADB3AD")
+# Export: incidents encoded in parallel processes (1 = one after another in-thread)
+EXPORT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Per-video pipeline: reader threads decode/overlay ahead of the encoder
+DECODE_WORKERS = 3
+DECODE_QUEUE_DEPTH = 8  # frames in flight (bounds memory)
+# Export resolution: 1 = full, 2 = half, 4 = quarter (downscaled during JPEG decode)
+EXPORT_SCALE = 1
+# Codec preset: "fast" (MJPG .avi), "balanced" (mp4v .mp4) or "small" (H.264 if available)
+EXPORT_PRESET = "balanced"
+CODEC_CACHE_PATH = os.path.join(CACHE_DIR, "codecs.json")
+# "encode": decode, overlay and re-encode every frame (EXPORT_SCALE / EXPORT_PRESET apply)
+# "passthrough": copy the original JPEGs into an MJPEG .avi, overlay in a .srt sidecar
+EXPORT_MODE = "encode"
+# Staging: write each video to local scratch (tmpfs/SSD), then stream it to the device
+EXPORT_STAGING = True
+STAGING_DIR = None  # None = /dev/shm if it has room, else the system temp dir
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+COPY_FSYNC_EVERY = 32 * 1024 * 1024
+# Learned output/input size ratios for the free-space checks
+SIZE_MODEL_PATH = os.path.join(CACHE_DIR, "size_model.json")
+
+# Incident segmentation (utils/segmentation.py)
+#   gap_seconds: a pause longer than this starts a new incident
+#   min_frames: shorter incidents are not exported
+#   max_duration: longer incidents are split into clips of at most this many seconds (None = never)
+#   merge_across_hours: an incident running over an hour boundary (for at most
+#       max_duration) stays one clip, exported with the hour it starts in
+SEGMENT_POLICY = {"gap_seconds": 30, "min_frames": 2, "max_duration": 900, "merge_across_hours": True}
+# Per-camera overrides by camera name, e.g. {"Front": {"gap_seconds": 15}}
+CAMERA_SEGMENT_POLICIES = {}
+
+# Incident preview thumbnails (utils/thumbnail_cache.py), least recently used dropped first
+THUMB_CACHE_DIR = os.path.join(CACHE_DIR, "thumbnails")
+THUMB_CACHE_MAX_BYTES = 200 * 1024 * 1024
+THUMB_WIDTH = 240
+THUMB_HEIGHT = 135   # preview textures are letterboxed to THUMB_WIDTH x THUMB_HEIGHT
+TEXTURE_POOL_SIZE = 48  # thumbnail textures kept on the GPU (more than fit on screen)
+
+# Font (registered with Kivy in ui_utils; config stays importable without Kivy)
+arial_path = os.path.join(RESOURCES_DIR, "arial.ttf")
 
 # Helper: build full path for a resource
 def resource_path(relative_path: str) -> str:
@@ -0,0 +1,436 @@
+import os, json, shutil, hashlib, tempfile, multiprocessing
+import numpy as np
+from collections import namedtuple
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from utils.config import (
+    EXPORT_WORKERS, EXPORT_SCALE, EXPORT_MODE, EXPORT_STAGING, STAGING_DIR, IST_OFFSET
+)
+from utils.logs import logger
+from utils.video_utils import export_video, srt_path_for
+from utils.file_utils import get_free_space_bytes, copy_to_device, CopyAborted, is_device_available
+from utils.segmentation import policy_for, segment_ranges
+
+MANIFEST_NAME = "export_manifest.json"
+
+
+def estimate_group_size(group):
+    """
+    Uncalibrated estimate (input sizes + 10%, stats every image); used when
+    encode_incidents gets no sizer from utils.size_model.
+    """
+    if not group:
+        return 0
+    sizes = [os.path.getsize(p) for p, _ in group if os.path.exists(p)]
+    if not sizes:
+        return 0
+    avg_img_size = sum(sizes) / len(sizes)
+    est = avg_img_size * len(group) * 1.1  # add ~10% overhead
+    return int(est)
+
+
+# ---------------------
+# Planning (one or many camera/hour folders per job)
+# ---------------------
+# One camera/hour output folder and its incidents (lists of (path, GMT datetime));
+# numbers: each group's incident number in the hour (file names keep it)
+ExportUnit = namedtuple("ExportUnit", "camera hour_label folder groups numbers")
+
+
+def hour_label_for(ist_hour):
+    """Hour spinner label for the IST hour starting at ist_hour: '09:00AM - 10:00AM'"""
+    return f"{ist_hour.strftime('%I:%M%p')} - {(ist_hour + timedelta(hours=1)).strftime('%I:%M%p')}"
+
+
+def hour_folder_name(hour_label):
+    """'09:00AM - 10:00AM' → '09.00AM_to_10.00AM'"""
+    return hour_label.replace(" ", "").replace(":", ".").replace("-", "_to_")
+
+
+def plan_export(selections, date_folder, policy=None, chosen=None):
+    """
+    Segment every selection into incidents up front.
+
+    selections: iterable of (camera, hour_label, frames) where frames is the
+        CameraFrames of that camera/hour (see utils.segmentation.select_hours
+        for selections that keep cross-hour incidents whole).
+    policy: SegmentPolicy for all cameras; None uses each camera's
+        configured policy (utils.segmentation.policy_for).
+    chosen: {(camera, hour_label): [IncidentSummary]} of previewed clips to
+        export instead. Their time spans are exported as they were shown,
+        under their preview numbers, without segmenting again, so frames
+        arriving since the preview cannot shift which incidents go out.
+    Returns [ExportUnit] for the selections that have at least one incident,
+    each with its output folder date_folder/<hour folder>/<camera>.
+    """
+    units = []
+    for camera, hour_label, frames in selections:
+        if chosen is None:
+            camera_policy = policy or policy_for(camera)
+            ranges = segment_ranges(frames.ts, camera_policy)
+            numbers = list(range(1, len(ranges) + 1))
+        else:
+            ranges, numbers = [], []
+            for incident in chosen.get((camera, hour_label), ()):
+                lo, hi = frames.range_indices(incident.start, np.nextafter(incident.end, np.inf))
+                if hi > lo:
+                    ranges.append((lo, hi))
+                    numbers.append(incident.number)
+                else:
+                    logger.warning("Previewed incident %d of %s %s has no images any more",
+                                   incident.number, camera, hour_label)
+        groups = [list(frames[lo:hi].items()) for lo, hi in ranges]
+        if groups:
+            folder = os.path.join(date_folder, hour_folder_name(hour_label), camera)
+            units.append(ExportUnit(camera, hour_label, folder, groups, numbers))
+    return units
+
+
+def incident_tasks(units, ext):
+    """
+    encode_incidents tasks for all units. Task numbers run across the whole
+    job; file names carry each incident's number within its hour.
+    """
+    tasks = []
+    for unit in units:
+        for idx, g in sorted(zip(unit.numbers, unit.groups), key=lambda item: item[1][0][1]):
+            start_ist = (g[0][1] + IST_OFFSET).strftime("%I.%M.%S%p")
+            end_ist = (g[-1][1] + IST_OFFSET).strftime("%I.%M.%S%p")
+            safe_name = f"incident_{idx}_{start_ist}_to_{end_ist}{ext}"
+            tasks.append((len(tasks) + 1, list(g), os.path.join(unit.folder, safe_name)))
+    return tasks
+
+
+# ---------------------
+# Export manifest (checkpoints for resume)
+# ---------------------
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExportManifest:
+    """
+    Completed incidents of one camera/hour export, kept on the device next
+    to the videos as export_manifest.json and rewritten (atomically) after
+    every finished incident. A later export of the same folder can then
+    verify what is already there and encode only what is missing.
+
+    entries: file name → {"frames", "size", "sha256", "srt" (has a sidecar)}
+    """
+
+    def __init__(self, folder, entries=None):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self.entries = entries or {}
+
+    @classmethod
+    def exists(cls, folder):
+        return os.path.isfile(os.path.join(folder, MANIFEST_NAME))
+
+    @classmethod
+    def load(cls, folder):
+        """Manifest for folder ({} if missing or unreadable)."""
+        try:
+            with open(os.path.join(folder, MANIFEST_NAME), encoding="utf-8") as f:
+                entries = json.load(f).get("incidents", {})
+        except (OSError, ValueError, AttributeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning("Ignoring unreadable export manifest in %s: %s", folder, e)
+            entries = {}
+        return cls(folder, entries)
+
+    def record(self, out_path, frames, size, sha256):
+        self.entries[os.path.basename(out_path)] = {
+            "frames": frames, "size": size, "sha256": sha256,
+            "srt": os.path.exists(srt_path_for(out_path)),
+        }
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "incidents": self.entries}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def verify(self, out_path, frames):
+        """True if out_path is recorded as complete for this many frames and still matches."""
+        entry = self.entries.get(os.path.basename(out_path))
+        if not entry or entry.get("frames") != frames:
+            return False
+        try:
+            if os.path.getsize(out_path) != entry["size"]:
+                return False
+            if entry.get("srt") and not os.path.exists(srt_path_for(out_path)):
+                return False
+            return file_sha256(out_path) == entry["sha256"]
+        except OSError:
+            return False
+
+
+def split_resumable(tasks, folders):
+    """
+    Resume support: check tasks against the manifests of their folders.
+    Leftover .part/.tmp files of an interrupted copy are removed.
+    Returns (manifests by folder, already saved tasks, remaining tasks).
+    """
+    manifests = {folder: ExportManifest.load(folder) for folder in folders}
+    saved, remaining = [], []
+    for task in tasks:
+        manifest = manifests[os.path.dirname(task[2])]
+        (saved if manifest.verify(task[2], len(task[1])) else remaining).append(task)
+    for folder in folders:
+        for name in os.listdir(folder):
+            if name.endswith((".part", ".tmp")):
+                os.remove(os.path.join(folder, name))
+    logger.info("Resuming export: %d of %d incident(s) already saved", len(saved), len(tasks))
+    return manifests, saved, remaining
+
+
+# ---------------------
+# Local staging
+# ---------------------
+def make_staging_dir(required_bytes):
+    """
+    Create a scratch directory for staged videos on the first of STAGING_DIR,
+    /dev/shm and the system temp dir with required_bytes free.
+    Returns None if none has room (videos are then written to the device directly).
+    """
+    for base in (STAGING_DIR, "/dev/shm", tempfile.gettempdir()):
+        if not base or not os.path.isdir(base) or not os.access(base, os.W_OK):
+            continue
+        if get_free_space_bytes(base) >= required_bytes:
+            return tempfile.mkdtemp(prefix="incident_export_", dir=base)
+    logger.warning("No local scratch space for %d MB; writing to the device directly",
+                   required_bytes // (1024*1024))
+    return None
+
+
+def deliver_staged(staged_path, out_path, abort_event, hasher=None):
+    """
+    Copy a staged video (and its .srt sidecar, if any) to the device and
+    drop the local copies. hasher is fed the video bytes only.
+    Returns (bytes_copied, seconds).
+    """
+    copied, seconds = copy_to_device(staged_path, out_path, abort_event, hasher=hasher)
+    os.remove(staged_path)
+    staged_srt = srt_path_for(staged_path)
+    if os.path.exists(staged_srt):
+        n, t = copy_to_device(staged_srt, srt_path_for(out_path), abort_event)
+        os.remove(staged_srt)
+        copied, seconds = copied + n, seconds + t
+    rate = copied / (1024*1024) / seconds if seconds > 0 else 0.0
+    logger.info("Copied %s to device: %.1f MB in %.2fs (%.1f MB/s)",
+                os.path.basename(out_path), copied / (1024*1024), seconds, rate)
+    return copied, seconds
+
+
+# ---------------------
+# Process-pool workers
+# ---------------------
+_worker_abort = None
+
+
+def _init_worker(abort_event):
+    global _worker_abort
+    _worker_abort = abort_event
+
+
+def _encode_worker(imgs, out_path, fps, scale, codec, mode):
+    return export_video(imgs, out_path, fps=fps, abort_event=_worker_abort,
+                        scale=scale, codec=codec, mode=mode)
+
+
+def encode_incidents(tasks, device, abort_event, fps=5, workers=EXPORT_WORKERS, progress=None,
+                     scale=EXPORT_SCALE, codec=None, mode=EXPORT_MODE, staging=EXPORT_STAGING,
+                     manifests=None, sizers=None):
+    """
+    Encode incident videos, several at a time in a process pool when workers > 1.
+
+    tasks: list of (idx, group, out_path) in incident order; idx/out_path are
+        fixed up front so naming does not depend on completion order.
+    abort_event: threading.Event; stops submitting and tells running encoders
+        to stop between frames.
+    progress: optional callable(done, total, mb_per_s) after each finished
+        incident; mb_per_s is the average device copy rate so far (None
+        without staging).
+    scale: export resolution divisor (1, 2 or 4), applied at decode time.
+    codec: CODEC_PROFILES name (out paths must use its extension).
+    mode: "encode" or "passthrough" (see export_video); passthrough is
+        disk-bound, so incidents are written one after another.
+    staging: encode into a local scratch directory (see make_staging_dir) and
+        stream each finished video to out_path with copy_to_device, which is
+        atomic (.part + rename) and fsyncs in large batches. Copies run on
+        this thread, one at a time, while the pool keeps encoding.
+    manifests: optional {output folder: ExportManifest}; each saved incident
+        is recorded in its folder's manifest (size + SHA-256) as soon as it
+        is on the device.
+    sizers: optional {output folder: size_model.IncidentSizer} for the space
+        checks (default estimate_group_size); they are also told each saved
+        video's real size.
+
+    Before each incident is started, free space on device must cover its
+    estimate plus the estimates of incidents still being written. A failed
+    incident on a device that is no longer available sets abort_event, so
+    nothing more is encoded for a target that is gone.
+
+    Returns (saved_files, failures, out_of_space):
+        saved_files: output paths in incident order
+        failures: [(idx, out_path, error_msg)]
+        out_of_space: None, or (idx, required_bytes, free_bytes) of the
+            incident that did not fit (nothing after it was started)
+    """
+    total = len(tasks)
+    results = {}
+    failures = []
+    out_of_space = None
+    copied_bytes, copy_seconds = 0, 0.0
+
+    if mode == "passthrough":
+        workers = 1  # parallel writers would only make the USB seek
+    manifests = manifests or {}
+    sizers = sizers or {}
+
+    def sizer_for(out_path):
+        return sizers.get(os.path.dirname(out_path))
+
+    estimates = {}
+    for idx, group, out_path in tasks:
+        sizer = sizer_for(out_path)
+        estimates[idx] = sizer.estimate(group) if sizer else estimate_group_size(group)
+    groups = {idx: group for idx, group, _ in tasks}
+    staging_dir = None
+    if staging and tasks:
+        # Room for every video that can sit in scratch at once (running + being copied)
+        largest = max(estimates.values())
+        staging_dir = make_staging_dir(largest * (min(workers, total) + 1))
+
+    def target(idx, out_path):
+        """
+        Where the encoder writes task idx's video. Hour folders reuse file
+        names, so staged copies carry the (job-wide) task number.
+        """
+        if not staging_dir:
+            return out_path
+        return os.path.join(staging_dir, f"{idx}_{os.path.basename(out_path)}")
+
+    def finish(idx, out_path, success, error_msg):
+        nonlocal copied_bytes, copy_seconds
+        manifest = manifests.get(os.path.dirname(out_path))
+        hasher = hashlib.sha256() if manifest is not None else None
+        if success and staging_dir:
+            try:
+                n, secs = deliver_staged(target(idx, out_path), out_path, abort_event, hasher)
+                copied_bytes += n
+                copy_seconds += secs
+            except CopyAborted:
+                success, error_msg = False, "Export aborted."
+            except OSError as e:
+                success, error_msg = False, f"Copy to device failed: {e}"
+        if success and manifest is not None:
+            try:
+                # Without staging the hash needs a read-back of the written file
+                digest = hasher.hexdigest() if staging_dir else file_sha256(out_path)
+                manifest.record(out_path, len(groups[idx]), os.path.getsize(out_path), digest)
+            except OSError as e:
+                success, error_msg = False, f"Could not record {out_path} in manifest: {e}"
+        if success:
+            results[idx] = out_path
+            sizer = sizer_for(out_path)
+            if sizer:
+                try:
+                    sizer.observe(groups[idx], os.path.getsize(out_path))
+                except OSError:
+                    pass
+        else:
+            failures.append((idx, out_path, error_msg))
+            logger.error("Failed to create incident video %s: %s", out_path, error_msg)
+            if not abort_event.is_set() and not is_device_available(device):
+                logger.warning("Device %s is gone; aborting the export.", device)
+                abort_event.set()
+        if progress:
+            rate = copied_bytes / (1024*1024) / copy_seconds if copy_seconds > 0 else None
+            progress(len(results) + len(failures), total, rate)
+
+    def space_for(idx, in_flight):
+        """(required, free) bytes for incident idx, with in-flight estimates reserved."""
+        return estimates[idx], max(get_free_space_bytes(device) - in_flight, 0)
+
+    def report_out_of_space(idx, required, free):
+        logger.error("Out of space on incident %d: need %d MB, have %d MB",
+                     idx, required // (1024*1024), free // (1024*1024))
+        return idx, required, free
+
+    try:
+        if workers <= 1 or total <= 1:
+            for idx, group, out_path in tasks:
+                if abort_event.is_set():
+                    logger.warning("Processing aborted while saving incident %d.", idx)
+                    break
+                required, free = space_for(idx, 0)
+                if free < required:
+                    out_of_space = report_out_of_space(idx, required, free)
+                    break
+                finish(idx, out_path, *export_video(
+                    group, target(idx, out_path), fps=fps, abort_event=abort_event, scale=scale,
+                    codec=codec, mode=mode))
+            return [results[i] for i in sorted(results)], failures, out_of_space
+
+        # Process pool: a multiprocessing.Event mirrors abort_event into the workers
+        # spawn, not fork: the app is multithreaded (index, watchers, Clock) and a
+        # forked child could inherit a held lock and the whole GUI state
+        ctx = multiprocessing.get_context("spawn")
+        worker_abort = ctx.Event()
+        pending = list(tasks)
+        running = {}  # future → (idx, out_path, estimate)
+        with ProcessPoolExecutor(max_workers=min(workers, total), mp_context=ctx,
+                                 initializer=_init_worker, initargs=(worker_abort,)) as pool:
+            while pending or running:
+                if abort_event.is_set() and not worker_abort.is_set():
+                    worker_abort.set()
+                    for future in running:
+                        future.cancel()
+                    pending = []
+                    logger.warning("Processing aborted with %d incident(s) in progress.", len(running))
+
+                # Keep the pool full, in incident order, while space allows
+                while pending and out_of_space is None and not abort_event.is_set() \
+                        and len(running) < workers:
+                    idx, group, out_path = pending[0]
+                    in_flight = sum(est for _, _, est in running.values())
+                    required, free = space_for(idx, in_flight)
+                    if free < required:
+                        if not running:
+                            out_of_space = report_out_of_space(idx, required, free)
+                            pending = []
+                        break  # wait for running incidents to release their reservation
+                    pending.pop(0)
+                    future = pool.submit(_encode_worker, group, target(idx, out_path), fps, scale,
+                                         codec, mode)
+                    running[future] = (idx, out_path, required)
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, out_path, _ = running.pop(future)
+                    if future.cancelled():
+                        continue
+                    try:
+                        success, error_msg = future.result()
+                    except Exception as e:
+                        success, error_msg = False, f"Encoder process failed: {e}"
+                    finish(idx, out_path, success, error_msg)
+
+        return [results[i] for i in sorted(results)], failures, out_of_space
+    finally:
+        if staging_dir:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        if copy_seconds > 0:
+            logger.info("Device copy total: %.1f MB at %.1f MB/s", copied_bytes / (1024*1024),
+                        copied_bytes / (1024*1024) / copy_seconds)
@@ -0,0 +1,200 @@
+import os, shutil, threading
+from collections import namedtuple
+from utils.config import EXPORT_MODE, EXPORT_PRESET, EXPORT_SCALE, EXPORT_WORKERS
+from utils.logs import logger
+from utils.file_utils import get_free_space_bytes, get_nuc_identifier, is_device_available
+from utils.video_utils import select_codec, export_extension
+from utils.size_model import get_size_model
+from utils.export import (
+    encode_incidents, ExportManifest, plan_export, incident_tasks, split_resumable
+)
+
+# ---------------------
+# Events (delivered to subscribers, in this order, from the job's thread)
+# ---------------------
+# Incidents are planned and folders prepared; encoding starts next
+Planned = namedtuple("Planned", "units tasks already_saved")
+# After every finished incident; mb_per_s is the device copy rate (None without staging)
+Progress = namedtuple("Progress", "done total mb_per_s")
+# The device cannot hold the planned incidents (followed by Finished("no_space"))
+SpaceShort = namedtuple("SpaceShort", "required free")
+# Output folders already exist and neither resume nor overwrite was asked for
+# (followed by Finished("exists")); resumable: at least one has a manifest
+FoldersExist = namedtuple("FoldersExist", "folders resumable date_folders")
+# Always the last event. status: "done", "cancelled", "device_lost" (cancelled
+# because the device went away), "no_images", "no_incidents", "no_space",
+# "exists" or "error" (error holds the message)
+Finished = namedtuple("Finished", "status saved_files failures out_of_space error")
+
+
+def export_date_folder(device, date_str):
+    """<device>/Cognitica AI/Vehicle_<id>/<IST date>: where a day's hour folders go."""
+    return os.path.join(device, "Cognitica AI", f"Vehicle_{get_nuc_identifier()}", date_str)
+
+
+class ExportJob:
+    """
+    One export run with explicit inputs, independent of any widget.
+
+    device: destination mount point (or folder)
+    selections_by_date: {IST date string: [(camera, hour label, CameraFrames)]}
+    resume / overwrite: what to do with output folders that already exist
+        (neither: stop with FoldersExist)
+    policy: SegmentPolicy for every camera (None: per-camera config)
+    chosen: {(camera, hour label): [IncidentSummary]} previewed clips to
+        export instead of every incident (see plan_export)
+    cancel: threading.Event used as the cancellation token (e.g. set on
+        device disconnect); a fresh one is created if not given.
+
+    run() executes the job on the calling thread and returns the Finished
+    event; start() runs it on a daemon thread. Subscribers are called with
+    each event from the job's thread, so UI code must hop to its own thread.
+    """
+
+    def __init__(self, device, selections_by_date, mode=EXPORT_MODE, preset=EXPORT_PRESET,
+                 scale=EXPORT_SCALE, workers=EXPORT_WORKERS, fps=5, policy=None,
+                 chosen=None, resume=False, overwrite=False, cancel=None):
+        self.device = device
+        self.selections_by_date = selections_by_date
+        self.mode = mode
+        self.preset = preset
+        self.scale = scale
+        self.workers = workers
+        self.fps = fps
+        self.policy = policy
+        self.chosen = chosen
+        self.resume = resume
+        self.overwrite = overwrite
+        self.cancel_event = cancel if cancel is not None else threading.Event()
+        self.result = None
+        self._subscribers = []
+        self._thread = None
+
+    # -- subscription / control --
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.result
+
+    def _emit(self, event):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Export job subscriber failed on %s", type(event).__name__)
+
+    def _finish(self, status, saved_files=(), failures=(), out_of_space=None, error=None):
+        self.result = Finished(status, list(saved_files), list(failures), out_of_space, error)
+        self._emit(self.result)
+        return self.result
+
+    # -- the job --
+    def run(self):
+        try:
+            return self._run()
+        except Exception as e:
+            logger.exception("Export job failed")
+            return self._finish("error", error=str(e))
+
+    def _run(self):
+        if self.cancelled:
+            logger.warning("Export cancelled before start.")
+            return self._finish("cancelled")
+
+        if not any(len(frames) for selections in self.selections_by_date.values()
+                   for _, _, frames in selections):
+            return self._finish("no_images")
+
+        units = []
+        for date_str, selections in self.selections_by_date.items():
+            units += plan_export(selections, export_date_folder(self.device, date_str),
+                                 policy=self.policy, chosen=self.chosen)
+        if not units:
+            return self._finish("no_incidents")
+
+        # One sizer per camera; image sizes come from the index (no stat calls)
+        codec = select_codec(self.preset)
+        codec_key = "passthrough" if self.mode == "passthrough" else codec.name
+        sizers = {}
+        for selections in self.selections_by_date.values():
+            for camera, _, frames in selections:
+                sizer = sizers.get(camera) or get_size_model().sizer(camera, codec_key, self.scale)
+                sizer.sizes.update(zip(frames.paths, frames.sizes.tolist()))
+                sizers[camera] = sizer
+        sizer_by_folder = {unit.folder: sizers[unit.camera] for unit in units}
+
+        tasks = incident_tasks(units, export_extension(codec.name, self.mode))
+        folders = [unit.folder for unit in units]
+
+        def has_space_for(tasks):
+            required = sum(sizer_by_folder[os.path.dirname(out_path)].estimate(group)
+                           for _, group, out_path in tasks)
+            free = get_free_space_bytes(self.device)
+            if free < required:
+                logger.warning("Not enough space: required=%d MB, available=%d MB",
+                               required // (1024*1024), free // (1024*1024))
+                self._emit(SpaceShort(required, free))
+            return free >= required
+
+        # Space first, before anything on the device is touched (on resume: after verifying)
+        if not self.resume and not has_space_for(tasks):
+            return self._finish("no_space")
+        if self.cancelled:
+            return self._finish("cancelled")
+
+        existing = [folder for folder in folders if os.path.exists(folder)]
+        if existing and not (self.resume or self.overwrite):
+            resumable = any(ExportManifest.exists(folder) for folder in existing)
+            date_folders = sorted({os.path.dirname(os.path.dirname(f)) for f in existing})
+            self._emit(FoldersExist(existing, resumable, date_folders))
+            return self._finish("exists")
+        if self.overwrite:
+            for folder in existing:
+                shutil.rmtree(folder, ignore_errors=True)
+                logger.info("Deleted old folder: %s", folder)
+        for folder in folders:
+            os.makedirs(folder, exist_ok=True)
+
+        already_saved = []
+        if self.resume:
+            manifests, already_saved, tasks = split_resumable(tasks, folders)
+            if not has_space_for(tasks):
+                return self._finish("no_space")
+        else:
+            manifests = {folder: ExportManifest(folder) for folder in folders}
+
+        self._emit(Planned(units, tasks, already_saved))
+        saved_files, failures, out_of_space = encode_incidents(
+            tasks, self.device, self.cancel_event, fps=self.fps, workers=self.workers,
+            progress=lambda done, total, rate: self._emit(Progress(done, total, rate)),
+            scale=self.scale, codec=codec.name, mode=self.mode, manifests=manifests,
+            sizers=sizer_by_folder)
+
+        if already_saved:
+            order = {out_path: idx for idx, _, out_path in already_saved + tasks}
+            saved_files = sorted(saved_files + [out_path for _, _, out_path in already_saved],
+                                 key=order.get)
+        if self.cancelled:
+            status = "cancelled" if is_device_available(self.device) else "device_lost"
+        else:
+            status = "done"
+        return self._finish(status, saved_files, failures, out_of_space)
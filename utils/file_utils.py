@@ -1,8 +1,9 @@
-import os, re, platform, string, logging
+import os, platform, string, logging, calendar, time, getpass
 from datetime import datetime
+import numpy as np
 import psutil
 from utils.logs import logger
-import psutil
+from utils.config import COPY_CHUNK_SIZE, COPY_FSYNC_EVERY
 
 def get_free_space_bytes(path):
     """Return free space in bytes for the filesystem containing 'path'."""
@@ -12,31 +13,166 @@ def get_free_space_bytes(path):
     except Exception:
         return 0
 
+class CopyAborted(Exception):
+    """Raised by copy_to_device when abort_event is set mid-copy."""
+
+
+def copy_to_device(src, dst, abort_event=None, chunk_size=COPY_CHUNK_SIZE,
+                   fsync_every=COPY_FSYNC_EVERY, hasher=None):
+    """
+    Stream src to dst in large chunks, fsync'ing every `fsync_every` bytes so
+    slow FAT/exFAT sticks get a few big flushes instead of a backlog at close.
+    The data goes to dst + ".part" and is renamed into place only after a
+    final fsync, so an interrupted copy never looks like a finished file.
+    hasher (e.g. hashlib.sha256()) is fed the data as it streams past.
+    Returns (bytes_copied, seconds). Raises OSError / CopyAborted; the .part
+    file is removed on failure when the device is still there.
+    """
+    part = dst + ".part"
+    start = time.monotonic()
+    copied = unsynced = 0
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    try:
+        with open(src, "rb", buffering=0) as fin, open(part, "wb", buffering=0) as fout:
+            while True:
+                if abort_event is not None and abort_event.is_set():
+                    raise CopyAborted(dst)
+                n = fin.readinto(buf)
+                if not n:
+                    break
+                if hasher is not None:
+                    hasher.update(view[:n])
+                written = 0
+                while written < n:
+                    written += fout.write(view[written:n])
+                copied += n
+                unsynced += n
+                if unsynced >= fsync_every:
+                    os.fsync(fout.fileno())
+                    unsynced = 0
+            os.fsync(fout.fileno())
+        os.replace(part, dst)
+    except BaseException:
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+        raise
+    try:
+        # Persist the rename itself (not supported on every filesystem / OS)
+        dir_fd = os.open(os.path.dirname(dst) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+    return copied, time.monotonic() - start
+
+
 def is_device_available(path):
     """Return True if the given device/mount path is still accessible."""
     return path and os.path.exists(path) and os.access(path, os.W_OK | os.R_OK)
 
 
+# Fixed layout "_YYYY-MM-DD_HH-MM-SS[-ffffff]_GMT": try the usual 6-digit
+# fraction first, then none, then the short ones.
+_FRACTION_LENGTHS = (6, 0, 1, 2, 3, 4, 5)
+_FRACTION_SCALE = {k: 10.0 ** k for k in range(1, 7)}
+_day_epoch_cache = {}
+
+
+def _gmt_slices(name, end):
+    """
+    Locate the timestamp that ends where "_GMT" starts (name[end]) and return
+    ("YYYY-MM-DD_HH-MM-SS", fraction digits) as strings, or None.
+    """
+    for k in _FRACTION_LENGTHS:
+        start = end - 20 - (k + 1 if k else 0)
+        if start < 0 or name[start] != "_" or name[start + 11] != "_":
+            continue
+        if k and name[end - k - 1] != "-":
+            continue
+        ts = name[start + 1:start + 20]
+        if ts[4] != "-" or ts[7] != "-" or ts[13] != "-" or ts[16] != "-":
+            continue
+        frac = name[end - k:end] if k else ""
+        digits = ts[11:].replace("-", "") + frac
+        if len(digits) != 6 + k or not (digits.isascii() and digits.isdigit()):
+            continue
+        return ts, frac
+    return None
+
+
+def _find_gmt_slices(filename):
+    end = filename.find("_GMT")
+    while end != -1:
+        found = _gmt_slices(filename, end)
+        if found:
+            return found
+        end = filename.find("_GMT", end + 1)
+    return None
+
+
+def _day_epoch(date_str):
+    """'YYYY-MM-DD' → GMT epoch of midnight (cached), or None if invalid."""
+    day = _day_epoch_cache.get(date_str)
+    if day is None:
+        try:
+            day = calendar.timegm(datetime.strptime(date_str, "%Y-%m-%d").timetuple())
+        except ValueError:
+            return None
+        _day_epoch_cache[date_str] = day
+    return day
+
+
+def parse_gmt_epoch(filename):
+    """
+    Fast path for the GMT timestamp in a filename: returns epoch seconds
+    (float) or None. Uses fixed-position slicing and int() instead of
+    regex/strptime; the midnight epoch is cached per date string since all
+    frames of a day share it.
+    """
+    found = _find_gmt_slices(filename)
+    if not found:
+        return None
+    ts, frac = found
+    day = _day_epoch(ts[:10])
+    if day is None:
+        return None
+    hour, minute, second = int(ts[11:13]), int(ts[14:16]), int(ts[17:19])
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    t = day + hour * 3600 + minute * 60 + second
+    return t + int(frac) / _FRACTION_SCALE[len(frac)] if frac else float(t)
+
+
+def parse_gmt_epochs(filenames):
+    """Batch parse_gmt_epoch: returns a float64 array, NaN where no timestamp."""
+    nan = float("nan")
+    parsed = [parse_gmt_epoch(name) for name in filenames]
+    return np.array([nan if t is None else t for t in parsed], dtype=np.float64)
+
+
 def extract_timestamp_from_filename(filename):
     """
     Expect filenames to contain a GMT timestamp like: _YYYY-MM-DD_HH-MM-SS-ffffff_GMT
-    If not present, returns None.
+    Microseconds are optional. If not present, returns None.
     """
-    m = re.search(r'_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(?:-\d{1,6})?)_GMT', filename)
-    if not m:
+    found = _find_gmt_slices(filename)
+    if not found or _day_epoch(found[0][:10]) is None:
         return None
-    ts_str = m.group(1)
-    # Accept microseconds optional
-    fmt = "%Y-%m-%d_%H-%M-%S-%f" if '-' in ts_str and ts_str.count('-') >= 6 else "%Y-%m-%d_%H-%M-%S"
+    ts, frac = found
     try:
-        dt = datetime.strptime(ts_str, fmt)
-        return dt  # this dt is GMT in your original design
-    except Exception:
-        # fallback attempt: try without microseconds
-        try:
-            return datetime.strptime(ts_str.split('-')[0:6].__repr__(), fmt)
-        except Exception:
-           return None
+        return datetime(  # this dt is GMT in your original design
+            int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+            int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+            int(frac.ljust(6, "0")) if frac else 0,
+        )
+    except ValueError:
+        return None
+
 
 def ensure_device_mounts():
     """
@@ -85,4 +221,30 @@ def clean_camera_name(folder_name: str) -> str:
     """Return camera name without camId- prefix."""
     if "-" in folder_name:
         return folder_name.split("-", 1)[1]
-    return folder_name
\ No newline at end of file
+    return folder_name
+
+
+def get_camera_folders(camera_root):
+    """Return (names, map) where names = cleaned camera names for UI, map = clean→real folder."""
+    try:
+        if not os.path.exists(camera_root):
+            logger.warning("Camera root not found: %s", camera_root)
+            return None, None   # <- return None so UI can handle popup
+
+        folders = [d for d in os.listdir(camera_root) if os.path.isdir(os.path.join(camera_root, d))]
+
+        # Build mapping: clean name -> real folder
+        camera_map = {clean_camera_name(f): f for f in folders}
+        return list(camera_map.keys()) if folders else ["No Camera"], camera_map
+
+    except Exception as e:
+        logger.error("Error listing camera folders: %s", e)
+        return None, None
+
+
+def get_nuc_identifier():
+    """Return system identifier (username or hostname)."""
+    try:
+        return getpass.getuser()  # logged-in user
+    except Exception:
+        return "unknown_system"
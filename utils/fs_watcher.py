@@ -0,0 +1,217 @@
+import os, time, struct, select, threading, ctypes, ctypes.util
+from utils.config import IMAGE_EXTENSIONS, WATCH_POLL_INTERVAL
+from utils.logs import logger
+from utils.image_index import IndexChanges
+
+# inotify(7) constants
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CLOSE_WRITE = 0x00000008
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal ctypes wrapper around the Linux inotify syscalls."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self):
+        """Return pending events as (wd, mask, name) tuples ([] if none)."""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, pos = [], 0
+        while pos + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Keeps the image index live while frames are being written.
+
+    Uses inotify on every camera folder (recursively) and feeds new/removed
+    images to ImageIndex.apply_changes(). Where inotify is unavailable it
+    falls back to an mtime-diff ImageIndex.refresh() every poll_interval
+    seconds. on_change(IndexChanges) is called from the watcher thread.
+    """
+
+    def __init__(self, index, camera_root, camera_paths, on_change, poll_interval=WATCH_POLL_INTERVAL):
+        self.index = index
+        self.camera_root = os.path.abspath(camera_root)
+        self.camera_paths = [os.path.abspath(p) for p in camera_paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._inotify = None
+        self._watches = {}  # wd → (camera path or None for the root, directory)
+        self._thread = None
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    def start(self):
+        """Register watches (so nothing written from now on is missed) and start the thread."""
+        try:
+            self._inotify = Inotify()
+            self._watch_dir(None, self.camera_root)
+            for camera_path in self.camera_paths:
+                self._watch_tree(camera_path, camera_path)
+            target = self._run_inotify
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable (%s); polling every %.0fs instead", e, self.poll_interval)
+            if self._inotify:
+                self._inotify.close()
+            self._inotify = None
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        logger.info("Folder watcher started (%s)", self.mode)
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_dir(self, camera_path, directory):
+        try:
+            wd = self._inotify.add_watch(directory)
+        except OSError as e:
+            logger.warning("Cannot watch %s: %s", directory, e)
+            return
+        self._watches[wd] = (camera_path, directory)
+
+    def _watch_tree(self, camera_path, top):
+        for root, dirs, _ in os.walk(top):
+            self._watch_dir(camera_path, root)
+
+    def _emit(self, changes):
+        if changes:
+            try:
+                self.on_change(changes)
+            except Exception:
+                logger.exception("Folder watcher callback failed")
+
+    def _update(self, camera_path, added=(), removed=(), rescan=False):
+        """Apply one camera's batch to the index; False if it failed (retried later)."""
+        try:
+            if rescan:
+                changes = IndexChanges(camera_path)
+                self.index.refresh(camera_path, changes=changes)
+            else:
+                changes = self.index.apply_changes(camera_path, added, removed)
+        except Exception as e:
+            logger.warning("Watcher update failed for %s (rescan in %.0fs): %s",
+                           camera_path, self.poll_interval, e)
+            return False
+        self._emit(changes)
+        return True
+
+    def _run_inotify(self):
+        poller = select.poll()
+        poller.register(self._inotify.fd, select.POLLIN)
+        retry, retry_at = set(), 0.0  # cameras whose last batch failed, rescanned after poll_interval
+        try:
+            while not self._stop.is_set():
+                if not poller.poll(1000) and not (retry and time.monotonic() >= retry_at):
+                    continue
+                added, removed, rescan = {}, {}, set()
+                if retry and time.monotonic() >= retry_at:
+                    rescan, retry = retry, set()
+                for wd, mask, name in self._inotify.read_events():
+                    if mask & IN_Q_OVERFLOW:
+                        rescan.update(self.camera_paths)
+                        continue
+                    if mask & IN_IGNORED:
+                        self._watches.pop(wd, None)
+                        continue
+                    camera_path, directory = self._watches.get(wd, (None, None))
+                    if directory is None or not name:
+                        continue
+                    path = os.path.join(directory, name)
+
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            if camera_path is None:  # new camera folder under the root
+                                camera_path = path
+                                self.camera_paths.append(path)
+                            try:
+                                self._watch_tree(camera_path, path)
+                            except OSError as e:
+                                logger.warning("Cannot watch new folder %s: %s", path, e)
+                            rescan.add(camera_path)
+                        elif camera_path is not None and mask & (IN_DELETE | IN_MOVED_FROM):
+                            rescan.add(camera_path)
+                        continue
+
+                    if camera_path is None or not name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    # IN_CREATE alone is ignored: the frame is indexed once fully written
+                    if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        added.setdefault(camera_path, []).append(path)
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        removed.setdefault(camera_path, []).append(path)
+
+                # Errors are handled per camera and batch; a failed one is rescanned later
+                failed = set()
+                for camera_path in added.keys() | removed.keys():
+                    if camera_path in rescan:
+                        continue
+                    if not self._update(camera_path, added.get(camera_path, ()), removed.get(camera_path, ())):
+                        failed.add(camera_path)
+                for camera_path in rescan:
+                    if not self._update(camera_path, rescan=True):
+                        failed.add(camera_path)
+                if failed:
+                    retry |= failed
+                    retry_at = time.monotonic() + self.poll_interval
+        except Exception:
+            # The inotify descriptor itself failed: keep the index live by polling
+            logger.exception("inotify watcher failed; polling every %.0fs instead", self.poll_interval)
+            self._inotify.close()
+            self._inotify = None
+            self._run_polling()
+            return
+        self._inotify.close()
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            for camera_path in list(self.camera_paths):
+                try:
+                    changes = IndexChanges(camera_path)
+                    self.index.refresh(camera_path, changes=changes)
+                    self._emit(changes)
+                except Exception as e:
+                    logger.warning("Polling refresh failed for %s: %s", camera_path, e)
@@ -0,0 +1,610 @@
+import os, sqlite3, threading, calendar
+from itertools import islice
+from datetime import datetime
+import numpy as np
+from utils.config import INDEX_DB_PATH, IMAGE_EXTENSIONS, IST_OFFSET
+from utils.logs import logger
+from utils.file_utils import parse_gmt_epoch
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path     TEXT PRIMARY KEY,
+    camera   TEXT NOT NULL,
+    parent   TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    path   TEXT PRIMARY KEY,
+    camera TEXT NOT NULL,
+    dir    TEXT NOT NULL,
+    ts     REAL NOT NULL,
+    size   INTEGER NOT NULL,
+    mtime  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_camera ON dirs(camera);
+CREATE INDEX IF NOT EXISTS idx_images_camera_ts ON images(camera, ts);
+CREATE INDEX IF NOT EXISTS idx_images_dir ON images(dir);
+"""
+
+
+IST_OFFSET_SECONDS = IST_OFFSET.total_seconds()
+PROGRESS_EVERY = 2000  # images read between progress callbacks
+INSERT_BATCH = 500  # new images per refresh() transaction (below SQLite's 999 parameters)
+
+
+def ist_to_epoch(ist_dt):
+    """Naive IST datetime → GMT epoch seconds."""
+    return calendar.timegm(ist_dt.timetuple()) + ist_dt.microsecond / 1e6 - IST_OFFSET_SECONDS
+
+
+def epoch_to_ist(ts):
+    """GMT epoch seconds → naive IST datetime."""
+    return datetime.utcfromtimestamp(ts) + IST_OFFSET
+
+
+def ist_day_bounds(ist_date):
+    """'YYYY-MM-DD' (IST) → (start, end) GMT epoch seconds, end exclusive."""
+    start = ist_to_epoch(datetime.strptime(ist_date, "%Y-%m-%d"))
+    return start, start + 86400
+
+
+def iter_incident_ranges(ts, gap_seconds=30, chunk=65536):
+    """
+    Yield (start, end) index ranges of the incidents in time-sorted epoch
+    seconds: a new incident starts wherever the gap to the previous frame
+    exceeds gap_seconds. ts may be an array or any iterator of floats; it is
+    consumed `chunk` values at a time with one np.diff per chunk, so no
+    datetimes, re-sorting or per-group lists are involved.
+    """
+    if isinstance(ts, np.ndarray):
+        chunks = (ts[i:i + chunk] for i in range(0, len(ts), chunk))
+    else:
+        it = iter(ts)
+        chunks = (np.fromiter(islice(it, chunk), dtype=np.float64) for _ in iter(int, 1))
+    start, offset, last = 0, 0, None
+    for block in chunks:
+        if not len(block):
+            break
+        # Gaps inside the block, plus the one across the previous block's end
+        breaks = np.flatnonzero(np.diff(block) > gap_seconds) + 1 + offset
+        if last is not None and block[0] - last > gap_seconds:
+            breaks = np.concatenate(([offset], breaks))
+        bounds = [start] + breaks.tolist()
+        yield from zip(bounds[:-1], bounds[1:])
+        start = bounds[-1]
+        offset += len(block)
+        last = block[-1]
+    if offset > start:
+        yield start, offset
+
+
+def _next_break(ts, i, limit, gap_seconds, window=256):
+    """
+    First index j in [i, limit) where an incident starts (j == 0 or a gap
+    above gap_seconds before ts[j]), else limit. Looks at growing windows,
+    so a long incident costs a few np.diff calls rather than a full scan.
+    """
+    if i == 0 or i >= limit:
+        return i
+    while i < limit:
+        block = ts[i - 1:min(i + window, limit)]
+        breaks = np.flatnonzero(np.diff(block) > gap_seconds)
+        if len(breaks):
+            return i + int(breaks[0])
+        i += len(block) - 1
+        window *= 4
+    return limit
+
+
+def _incident_first(ts, i, gap_seconds, floor=0, window=256):
+    """
+    Index of the first frame of the incident holding ts[i], searching back
+    no further than floor; None when that incident starts before floor.
+    """
+    # The gap just before ts[floor] decides whether the incident starts there
+    bottom = max(floor - 1, 0)
+    while i > bottom:
+        lo = max(bottom, i - window)
+        breaks = np.flatnonzero(np.diff(ts[lo:i + 1]) > gap_seconds)
+        if len(breaks):
+            return lo + int(breaks[-1]) + 1
+        i = lo
+        window *= 4
+    return 0 if floor == 0 else None
+
+
+def image_timestamp(filename, mtime):
+    """GMT epoch seconds for an image: filename timestamp, else file mtime."""
+    ts = parse_gmt_epoch(filename)
+    return float(mtime) if ts is None else ts
+
+
+class CameraFrames:
+    """
+    Time-sorted columnar view of a camera's images.
+
+    paths is a list, ts (GMT epoch seconds) and sizes are parallel NumPy
+    arrays. Slicing returns another CameraFrames sharing the same arrays, and
+    between() is a binary search instead of a scan.
+    """
+    __slots__ = ("paths", "ts", "sizes")
+
+    def __init__(self, paths, ts, sizes):
+        self.paths = paths
+        self.ts = ts
+        self.sizes = sizes
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("CameraFrames only supports slicing")
+        return CameraFrames(self.paths[key], self.ts[key], self.sizes[key])
+
+    def range_indices(self, start, end):
+        """Return (lo, hi) so that ts[lo:hi] covers start <= ts < end."""
+        lo, hi = np.searchsorted(self.ts, (start, end), side="left")
+        return int(lo), int(hi)
+
+    def between(self, start, end):
+        """Frames with start <= ts < end (GMT epoch seconds)."""
+        lo, hi = self.range_indices(start, end)
+        return self[lo:hi]
+
+    def incident_range_indices(self, start, end, gap_seconds=30, max_span=None, after=None):
+        """
+        (lo, hi) for start <= ts < end, with hi moved past `end` to the last
+        frame of the incident still running there, provided that incident
+        spans at most max_span seconds (None: end - start) from its first
+        frame; a longer one is cut at `end`, so a busy hour never swallows
+        the next. after: where the preceding range of the same job stopped;
+        frames before it were taken by that range and are skipped here.
+        """
+        ts = self.ts
+        lo, hi = self.range_indices(start, end)
+        if after is not None and after > lo:
+            lo = after
+            hi = max(hi, lo)
+        if lo < hi < len(ts) and ts[hi] - ts[hi - 1] <= gap_seconds:
+            span = end - start if max_span is None else max_span
+            floor = int(np.searchsorted(ts, ts[hi - 1] - span, side="left"))
+            first = _incident_first(ts, hi - 1, gap_seconds, floor)
+            if first is not None:
+                last = int(np.searchsorted(ts, ts[first] + span, side="right"))
+                stop = _next_break(ts, hi, min(last + 1, len(ts)), gap_seconds)
+                if stop <= last:
+                    hi = stop
+        return lo, hi
+
+    def incidents(self, gap_seconds=30, min_frames=1):
+        """Yield a CameraFrames slice per incident (see iter_incident_ranges)."""
+        for lo, hi in iter_incident_ranges(self.ts, gap_seconds):
+            if hi - lo >= min_frames:
+                yield self[lo:hi]
+
+    def items(self):
+        """Yield (path, GMT datetime) pairs, the shape the video helpers expect."""
+        for path, t in zip(self.paths, self.ts.tolist()):
+            yield path, datetime.utcfromtimestamp(t)
+
+    def merged(self, other):
+        """Return a new CameraFrames with other's frames inserted in time order."""
+        if not len(other):
+            return self
+        # Drop frames we already hold (same path at the same timestamp)
+        lo = np.searchsorted(self.ts, other.ts, side="left")
+        hi = np.searchsorted(self.ts, other.ts, side="right")
+        keep = [i for i, path in enumerate(other.paths)
+                if lo[i] == hi[i] or path not in self.paths[lo[i]:hi[i]]]
+        if not keep:
+            return self
+        paths = self.paths + [other.paths[i] for i in keep]
+        ts = np.concatenate((self.ts, other.ts[keep]))
+        sizes = np.concatenate((self.sizes, other.sizes[keep]))
+        if len(self) and other.ts[keep].min() < self.ts[-1]:
+            order = np.argsort(ts, kind="stable")
+            paths = [paths[i] for i in order.tolist()]
+            ts, sizes = ts[order], sizes[order]
+        return CameraFrames(paths, ts, sizes)
+
+    def without(self, paths):
+        """Return a new CameraFrames minus the given paths."""
+        paths = set(paths)
+        keep = [i for i, p in enumerate(self.paths) if p not in paths]
+        if len(keep) == len(self):
+            return self
+        return CameraFrames([self.paths[i] for i in keep], self.ts[keep], self.sizes[keep])
+
+
+class IndexChanges:
+    """Images added to / removed from one camera by a refresh or a watcher batch."""
+
+    def __init__(self, camera_path):
+        self.camera_path = os.path.abspath(camera_path)
+        self.added = []       # (path, ts, size)
+        self.removed = set()  # paths
+
+    def __bool__(self):
+        return bool(self.added or self.removed)
+
+    def added_frames(self):
+        """The added images as a time-sorted CameraFrames."""
+        if not self.added:
+            return CameraFrames.empty()
+        rows = sorted(self.added, key=lambda r: (r[1], r[0]))
+        paths, ts, sizes = zip(*rows)
+        return CameraFrames(list(paths), np.array(ts, dtype=np.float64),
+                            np.array(sizes, dtype=np.int64))
+
+
+class DateHourHistogram:
+    """
+    Image counts per IST date and hour for one camera.
+
+    Keys are IST hour numbers since the epoch, grouped per IST day, so
+    "does this camera have data on D" and "which hours of D" are dict
+    lookups instead of scans.
+    """
+
+    def __init__(self):
+        self._days = {}  # IST day number → {hour of day: count}
+
+    def copy(self):
+        snapshot = DateHourHistogram()
+        snapshot._days = {day: dict(hours) for day, hours in self._days.items()}
+        return snapshot
+
+    def add_hour(self, hour_number, count):
+        day, hour = divmod(int(hour_number), 24)
+        hours = self._days.setdefault(day, {})
+        total = hours.get(hour, 0) + count
+        if total > 0:
+            hours[hour] = total
+        else:
+            hours.pop(hour, None)
+            if not hours:
+                del self._days[day]
+
+    def add(self, timestamps, sign=1):
+        """Count GMT epoch timestamps in (sign=1) or out (sign=-1)."""
+        for ts in timestamps:
+            self.add_hour((ts + IST_OFFSET_SECONDS) // 3600, sign)
+
+    @staticmethod
+    def _day_number(ist_date):
+        return calendar.timegm(datetime.strptime(ist_date, "%Y-%m-%d").timetuple()) // 86400
+
+    def has_date(self, ist_date):
+        return self._day_number(ist_date) in self._days
+
+    def hours(self, ist_date):
+        """Sorted IST hours of day (0-23) with images on ist_date."""
+        return sorted(self._days.get(self._day_number(ist_date), ()))
+
+    def count(self, ist_date, hour=None):
+        hours = self._days.get(self._day_number(ist_date), {})
+        return sum(hours.values()) if hour is None else hours.get(hour, 0)
+
+    def date_range(self):
+        """(first, last) IST dates with images, as datetime.date, or None."""
+        if not self._days:
+            return None
+        first, last = min(self._days), max(self._days)
+        return (datetime.utcfromtimestamp(first * 86400).date(),
+                datetime.utcfromtimestamp(last * 86400).date())
+
+
+class ImageIndex:
+    """
+    Persistent on-disk index of every image under a camera folder.
+
+    Stores path, GMT timestamp (epoch seconds), size and mtime per image plus
+    the mtime of every directory. refresh() only re-lists directories whose
+    mtime changed since the last run, so selecting a camera is a lookup
+    instead of a full os.walk.
+    """
+
+    def __init__(self, db_path=INDEX_DB_PATH):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # one refresh() at a time; readers only need _lock
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._histograms = {}  # camera path → DateHourHistogram
+        # camera path → copy of its histogram as of the last finished update;
+        # replaced whole (never mutated) so the UI can read it without the lock
+        self._snapshots = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def refresh(self, camera_path, cancel=None, progress=None, changes=None):
+        """
+        Bring the index for camera_path in line with the filesystem.
+
+        cancel: optional threading.Event; checked for every image, the scan
+            stops soon after it is set (work done so far is kept, nothing is
+            pruned and the interrupted directory is re-listed next time).
+        progress: optional callable(images_seen) called as images are read.
+        changes: optional IndexChanges that collects the added/removed images.
+        Returns (added, removed) image counts.
+
+        New images are stat'ed outside the lock and written INSERT_BATCH at a
+        time, so lookups and watcher updates are not held up by a long scan.
+        """
+        camera_path = os.path.abspath(camera_path)
+        added = removed = 0
+        images_seen = 0
+
+        def cancelled():
+            return cancel is not None and cancel.is_set()
+
+        with self._refresh_lock:
+            with self._lock:
+                known = {}
+                children = {}
+                for path, parent, mtime_ns in self._conn.execute(
+                        "SELECT path, parent, mtime_ns FROM dirs WHERE camera = ?", (camera_path,)):
+                    known[path] = mtime_ns
+                    children.setdefault(parent, []).append(path)
+
+            seen = set()
+            listed = []  # directories whose dirs row this run rewrote
+            stack = [camera_path]
+            while stack and not cancelled():
+                d = stack.pop()
+                try:
+                    st = os.stat(d)
+                except OSError:
+                    continue
+                seen.add(d)
+
+                # Unchanged directory → same entries, reuse the known sub-directories
+                if known.get(d) == st.st_mtime_ns:
+                    stack.extend(children.get(d, []))
+                    continue
+
+                subdirs, files = [], {}
+                try:
+                    with os.scandir(d) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.path)
+                                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                                    files[entry.path] = entry
+                            except OSError:
+                                continue
+                except OSError as e:
+                    logger.warning("Index: cannot list %s: %s", d, e)
+                    continue
+
+                with self._lock:
+                    existing = dict(self._conn.execute(
+                        "SELECT path, ts FROM images WHERE dir = ?", (d,)).fetchall())
+                    gone = existing.keys() - files.keys()
+                    if gone:
+                        self._conn.executemany("DELETE FROM images WHERE path = ?",
+                                               ((p,) for p in gone))
+                        self._conn.commit()
+                        removed += len(gone)
+                        hist = self._histograms.get(camera_path)
+                        if hist is not None:
+                            hist.add((existing[p] for p in gone), -1)
+                        if changes is not None:
+                            changes.removed.update(gone)
+
+                rows = []
+                for path in files.keys() - existing:
+                    if cancelled():
+                        break
+                    images_seen += 1
+                    if progress and images_seen % PROGRESS_EVERY == 0:
+                        progress(images_seen)
+                    try:
+                        fst = files[path].stat()
+                    except OSError:
+                        continue
+                    ts = image_timestamp(files[path].name, fst.st_mtime)
+                    rows.append((path, camera_path, d, ts, fst.st_size, fst.st_mtime))
+                    if len(rows) == INSERT_BATCH:
+                        added += self._insert_rows(camera_path, rows, changes)
+                        rows = []
+                added += self._insert_rows(camera_path, rows, changes)
+                if cancelled():
+                    break  # no dirs row, so the next refresh lists d again
+
+                images_seen += len(existing) - len(gone)
+                with self._lock:
+                    parent = None if d == camera_path else os.path.dirname(d)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dirs (path, camera, parent, mtime_ns) VALUES (?, ?, ?, ?)",
+                        (d, camera_path, parent, st.st_mtime_ns))
+                    self._conn.commit()
+                    self._update_snapshot(camera_path)
+                listed.append(d)
+                # A sub-directory may have been replaced, so walk all of them
+                stack.extend(subdirs)
+                if progress:
+                    progress(images_seen)
+
+            if cancelled():
+                # Their sub-directories may not have been walked yet: have the
+                # next refresh list them again rather than trust the mtime
+                with self._lock:
+                    self._conn.executemany("UPDATE dirs SET mtime_ns = -1 WHERE path = ?",
+                                           ((d,) for d in listed))
+                    self._conn.commit()
+                    self._update_snapshot(camera_path)
+                logger.info("Index refresh cancelled for %s", camera_path)
+                return added, removed
+
+            # Directories that disappeared take their images with them
+            with self._lock:
+                cur = self._conn.cursor()
+                hist = self._histograms.get(camera_path)
+                for d in known.keys() - seen:
+                    dropped = cur.execute("SELECT path, ts FROM images WHERE dir = ?", (d,)).fetchall()
+                    if hist is not None:
+                        hist.add((r[1] for r in dropped), -1)
+                    if changes is not None:
+                        changes.removed.update(r[0] for r in dropped)
+                    n = cur.execute("DELETE FROM images WHERE dir = ?", (d,)).rowcount
+                    removed += max(n, 0)
+                    cur.execute("DELETE FROM dirs WHERE path = ?", (d,))
+
+                self._conn.commit()
+                self._update_snapshot(camera_path)
+
+        if added or removed:
+            logger.info("Index refreshed for %s: +%d / -%d images", camera_path, added, removed)
+        return added, removed
+
+    def _insert_rows(self, camera_path, rows, changes):
+        """
+        Add refresh() rows not indexed yet (the watcher may have got there
+        first) in one transaction; returns how many were new.
+        """
+        if not rows:
+            return 0
+        with self._lock:
+            present = {p for (p,) in self._conn.execute(
+                f"SELECT path FROM images WHERE path IN ({','.join('?' * len(rows))})",
+                [r[0] for r in rows])}
+            rows = [r for r in rows if r[0] not in present]
+            self._conn.executemany(
+                "INSERT INTO images (path, camera, dir, ts, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+                rows)
+            self._conn.commit()
+            hist = self._histograms.get(camera_path)  # may have been built since the scan began
+            if hist is not None:
+                hist.add(r[3] for r in rows)
+        if changes is not None:
+            changes.added.extend((r[0], r[3], r[4]) for r in rows)
+        return len(rows)
+
+    def _update_snapshot(self, camera_path):
+        hist = self._histograms.get(camera_path)
+        if hist is not None:
+            self._snapshots[camera_path] = hist.copy()
+
+    def apply_changes(self, camera_path, added_paths=(), removed_paths=()):
+        """
+        Record individual files reported by the folder watcher without a
+        directory scan. Paths already indexed (or gone again) are ignored.
+        Returns the IndexChanges actually applied.
+        """
+        changes = IndexChanges(camera_path)
+        camera_path = changes.camera_path
+        with self._lock:
+            cur = self._conn.cursor()
+            hist = self._histograms.get(camera_path)
+            for path in removed_paths:
+                row = cur.execute("SELECT ts FROM images WHERE path = ?", (path,)).fetchone()
+                if row is None:
+                    continue
+                cur.execute("DELETE FROM images WHERE path = ?", (path,))
+                changes.removed.add(path)
+                if hist is not None:
+                    hist.add((row[0],), -1)
+
+            rows = []
+            for path in added_paths:
+                if cur.execute("SELECT 1 FROM images WHERE path = ?", (path,)).fetchone():
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                ts = image_timestamp(os.path.basename(path), st.st_mtime)
+                rows.append((path, camera_path, os.path.dirname(path), ts, st.st_size, st.st_mtime))
+            if rows:
+                cur.executemany(
+                    "INSERT OR REPLACE INTO images (path, camera, dir, ts, size, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                changes.added.extend((r[0], r[3], r[4]) for r in rows)
+                if hist is not None:
+                    hist.add(r[3] for r in rows)
+            self._conn.commit()
+            if hist is not None and changes:
+                self._snapshots[camera_path] = hist.copy()
+        return changes
+
+    def is_indexed(self, camera_path):
+        """True once camera_path has been refreshed at least once."""
+        camera_path = os.path.abspath(camera_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM dirs WHERE path = ?", (camera_path,)).fetchone()
+        return row is not None
+
+    def histogram(self, camera_path):
+        """
+        Return the DateHourHistogram for camera_path. Built from the index
+        with one GROUP BY the first time, then updated by every refresh().
+        """
+        camera_path = os.path.abspath(camera_path)
+        with self._lock:
+            hist = self._histograms.get(camera_path)
+            if hist is None:
+                hist = DateHourHistogram()
+                for hour, count in self._conn.execute(
+                        "SELECT CAST((ts + ?) / 3600 AS INTEGER) AS h, COUNT(*) "
+                        "FROM images WHERE camera = ? GROUP BY h",
+                        (IST_OFFSET_SECONDS, camera_path)):
+                    hist.add_hour(hour, count)
+                self._histograms[camera_path] = hist
+                self._snapshots[camera_path] = hist.copy()
+            return hist
+
+    def histogram_snapshot(self, camera_path):
+        """
+        The camera's histogram as of its last finished refresh, without taking
+        the index lock (safe on the UI thread while a scan runs elsewhere).
+        None until histogram() has been built for camera_path.
+        """
+        return self._snapshots.get(os.path.abspath(camera_path))
+
+    def image_paths(self, camera_path):
+        """Return all indexed image paths for camera_path, sorted by path."""
+        camera_path = os.path.abspath(camera_path)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM images WHERE camera = ? ORDER BY path", (camera_path,)).fetchall()
+        return [r[0] for r in rows]
+
+    def frames(self, camera_path):
+        """Return a time-sorted CameraFrames for camera_path."""
+        camera_path = os.path.abspath(camera_path)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, ts, size FROM images WHERE camera = ? ORDER BY ts, path",
+                (camera_path,)).fetchall()
+        if not rows:
+            return CameraFrames.empty()
+        paths, ts, sizes = zip(*rows)
+        return CameraFrames(list(paths), np.array(ts, dtype=np.float64),
+                            np.array(sizes, dtype=np.int64))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_image_index():
+    """Return the shared ImageIndex, opening the database on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ImageIndex()
+        return _index
@@ -1,48 +1,28 @@
 import os
-import getpass
 import threading
 import platform, time
 from datetime import datetime, timedelta
 from kivy.clock import Clock
 # from utils.file_utils import extract_timestamp_from_filename, ensure_device_mounts,is_device_available,clean_camera_name
-from utils.config import IST_OFFSET
+from utils.config import DEVICE_CHECK_INTERVAL, EXPORT_SCALE
 from utils.logs import logger
-from utils.video_utils import create_video_from_image_paths, group_images_by_incident
+from utils.export import hour_label_for
+from utils.segmentation import policy_for, select_hours, incident_summaries
+from utils.export_job import ExportJob, Planned, Progress, SpaceShort, FoldersExist, Finished
+from utils.fs_watcher import FolderWatcher
+from utils.image_index import (
+    get_image_index,
+    CameraFrames,
+    ist_day_bounds,
+    ist_to_epoch
+)
 from utils.file_utils import (
-    extract_timestamp_from_filename,
+    get_camera_folders,
     ensure_device_mounts,
     is_device_available,
-    clean_camera_name,
-    get_free_space_bytes
+    clean_camera_name
 )
 
-def estimate_group_size(group):
-    """Estimate output video size based on input image sizes."""
-    if not group:
-        return 0
-    sizes = [os.path.getsize(p) for p, _ in group if os.path.exists(p)]
-    if not sizes:
-        return 0
-    avg_img_size = sum(sizes) / len(sizes)
-    est = avg_img_size * len(group) * 1.1  # add ~10% overhead
-    return int(est)
-def get_camera_folders(camera_root):
-    """Return (names, map) where names = cleaned camera names for UI, map = clean→real folder."""
-    try:
-        if not os.path.exists(camera_root):
-            logger.warning("Camera root not found: %s", camera_root)
-            return None, None   # <- return None so UI can handle popup
-
-        folders = [d for d in os.listdir(camera_root) if os.path.isdir(os.path.join(camera_root, d))]
-
-        # Build mapping: clean name -> real folder
-        camera_map = {clean_camera_name(f): f for f in folders}
-        return list(camera_map.keys()) if folders else ["No Camera"], camera_map
-
-    except Exception as e:
-        logger.error("Error listing camera folders: %s", e)
-        return None, None
-
 def eject_device(mount_point):
     """Try to safely eject the USB device after successful copy."""
     try:
@@ -62,110 +42,224 @@ def eject_device(mount_point):
     except Exception as e:
         logger.error(f"Auto-eject failed: {e}")
         return False
-def get_nuc_identifier():
-    """Return system identifier (username or hostname)."""
-    try:
-        return getpass.getuser()  # logged-in user
-    except Exception:
-        return "unknown_system"
 def on_camera_selected(self, camera_value):
+    # 🔹 Any scan still running for the previously picked camera is stale now
+    if getattr(self, "scan_cancel", None) is not None:
+        self.scan_cancel.set()
+        self.scan_cancel = None
+        self.scanning = False
+
     if camera_value.upper().startswith(("NO", "SELECT")):
         return
 
     real_folder = self.camera_map.get(camera_value, camera_value)
     camera_path = os.path.join(self.camera_root, real_folder)
 
-    self.image_paths = []
-    try:
-        for root, _, files in os.walk(camera_path):
-            for f in sorted(files):
-                if f.lower().endswith((".jpg", ".jpeg", ".png")):
-                    self.image_paths.append(os.path.join(root, f))
-        logger.info("Camera selected: %s (%d images found)", camera_value, len(self.image_paths))
-    except Exception as e:
-        logger.error("Error scanning camera folder: %s", e)
-        self.image_paths.clear()
-
     # 🔹 Reset date/hour whenever camera changes
+    self.camera_path = os.path.abspath(camera_path)
+    self.frames = CameraFrames.empty()
     self.start_date = None
-    self.start_button.text = "Select Date"
     self.hour_spinner.text = "Select Hour"
     self.hour_spinner.values = []
-    self.available_images.clear()
+    self.available_images = CameraFrames.empty()
     self.hour_label_map.clear()
 
-def auto_refresh_devices(self):
-    new_devices = ensure_device_mounts()
+    # Scan off the UI thread; the date button shows progress meanwhile
+    cancel = threading.Event()
+    self.scan_cancel = cancel
+    self.scanning = True
+    self.pending_index_changes = []
+    self.start_button.text = "Loading..."
+    threading.Thread(
+        target=lambda: _scan_camera_thread(self, camera_value, camera_path, cancel),
+        daemon=True
+    ).start()
+
+
+def _scan_camera_thread(self, camera_value, camera_path, cancel):
+    """Refresh the image index for one camera in background, streaming progress to the UI."""
+    def report(count):
+        if not cancel.is_set():
+            Clock.schedule_once(lambda dt: _show_scan_progress(self, cancel, count), 0)
+
+    try:
+        index = get_image_index()
+        index.refresh(camera_path, cancel=cancel, progress=report)
+        if cancel.is_set():
+            logger.info("Scan of %s aborted (camera changed).", camera_value)
+            return
+        frames = index.frames(camera_path)
+        index.histogram(camera_path)  # hour labels read its snapshot on the UI thread
+    except Exception as e:
+        logger.error("Error scanning camera folder: %s", e)
+        frames = CameraFrames.empty()
+
+    Clock.schedule_once(lambda dt: _finish_camera_scan(self, camera_value, cancel, frames), 0)
+
+
+def _show_scan_progress(self, cancel, count):
+    if cancel is self.scan_cancel and not cancel.is_set():
+        self.start_button.text = f"Loading... {count:,}"
+
+
+def _finish_camera_scan(self, camera_value, cancel, frames):
+    if cancel is not self.scan_cancel or cancel.is_set():
+        return  # a newer camera pick owns the UI now
+    self.frames = frames
+    self.scanning = False
+    self.scan_cancel = None
+    self.start_button.text = "Select Date"
+    logger.info("Camera selected: %s (%d images found)", camera_value, len(frames))
+
+    pending, self.pending_index_changes = self.pending_index_changes, []
+    for changes in pending:
+        apply_index_changes(self, changes)
+
+def warm_camera_index(self):
+    """
+    Index every camera folder in background so per-camera histograms are ready,
+    then keep the index live with the folder watcher. Runs once per screen:
+    afterwards the watcher (which also picks up new camera folders) keeps it current.
+    """
+    if getattr(self, "index_warm_started", False):
+        return
+    self.index_warm_started = True
+    paths = [os.path.join(self.camera_root, real) for real in (self.camera_map or {}).values()]
+
+    def run():
+        index = get_image_index()
+        # Watch first so frames written during the warm-up scan aren't missed
+        if getattr(self, "fs_watcher", None) is None and os.path.isdir(self.camera_root):
+            self.fs_watcher = FolderWatcher(
+                index, self.camera_root, paths,
+                on_change=lambda changes: Clock.schedule_once(
+                    lambda dt: apply_index_changes(self, changes), 0)
+            )
+            self.fs_watcher.start()
+        for camera_path in paths:
+            try:
+                index.refresh(camera_path)
+                index.histogram(camera_path)
+            except Exception as e:
+                logger.warning("Index warm-up failed for %s: %s", camera_path, e)
+        logger.info("Image index ready for %d camera(s)", len(paths))
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def apply_index_changes(self, changes):
+    """Merge images reported by the folder watcher into the selected camera's view."""
+    if changes.camera_path != getattr(self, "camera_path", None):
+        return
+    if getattr(self, "scanning", False):
+        # The scan's snapshot may already be taken; replay once it lands
+        self.pending_index_changes.append(changes)
+        return
+
+    frames = self.frames
+    if changes.removed:
+        frames = frames.without(changes.removed)
+    frames = frames.merged(changes.added_frames())
+    if frames is self.frames:
+        return
+    self.frames = frames
+
+    # Keep the selected day's hours current without touching the user's choice
+    if self.start_date:
+        day_start, day_end = ist_day_bounds(self.start_date)
+        self.available_images = self.frames.between(day_start, day_end)
+        self.hour_label_map, display = build_hour_labels(self.camera_path, self.start_date)
+        self.hour_spinner.values = hour_spinner_values(display)
+
+
+def auto_refresh_devices(self, new_devices=None):
+    """Push the device list to the spinner, only when the set of devices changed."""
+    if new_devices is None:
+        new_devices = ensure_device_mounts()
     if set(new_devices) != set(self.device_spinner.values):
         self.device_spinner.values = new_devices
         if self.device_spinner.text not in new_devices:
             self.device_spinner.text = "Select Device" if new_devices else "No Device"
 
 
+# Hour spinner entry that exports every hour of the day in one job
+ALL_HOURS_LABEL = "All Hours"
+
+# Resolution spinner: label → EXPORT_SCALE divisor (encode mode; passthrough keeps the JPEGs)
+RESOLUTION_LABELS = {"Full Size": 1, "1/2 Size": 2, "1/4 Size": 4}
+
+
+def resolution_label(scale=EXPORT_SCALE):
+    """Spinner label for an export scale (the default one on startup)."""
+    return next((label for label, value in RESOLUTION_LABELS.items() if value == scale), "Full Size")
+
+
+def hour_spinner_values(display):
+    """Hour labels for the spinner, led by ALL_HOURS_LABEL when there is more than one."""
+    return [ALL_HOURS_LABEL] + display if len(display) > 1 else display
+
+
+def build_hour_labels(camera_path, selected_ist_date):
+    """
+    Return (label → IST hour start, labels in order) for the hours with
+    images. Reads the histogram snapshot, so it never waits on a running scan.
+    """
+    hour_label_map = {}
+    display = []
+    day = datetime.strptime(selected_ist_date, "%Y-%m-%d")
+    hist = get_image_index().histogram_snapshot(camera_path)
+    for hour in (hist.hours(selected_ist_date) if hist is not None else ()):
+        h = day + timedelta(hours=hour)
+        label = hour_label_for(h)
+        hour_label_map[label] = h
+        display.append(label)
+    return hour_label_map, display
+
+
 def on_date_selected(self, selected_ist_date):
     """Load images for the selected camera & date.
        If none, then check other cameras to decide popup message with suggestions."""
-    if not hasattr(self, "image_paths"):
+    if not hasattr(self, "frames"):
         self.show_popup("Please select a camera first.")
         return
+    if getattr(self, "scanning", False):
+        self.show_popup("Still loading images for this camera. Please try again.", reset_ui=False)
+        return
 
-    #  Step 1: Check selected camera
-    self.available_images.clear()
-    for path in self.image_paths:
-        ts_gmt = extract_timestamp_from_filename(os.path.basename(path))
-        if not ts_gmt:
-            ts_gmt = datetime.utcfromtimestamp(os.path.getmtime(path))
-        ts_ist = ts_gmt + IST_OFFSET
-
-        if ts_ist.strftime("%Y-%m-%d") == selected_ist_date:
-            self.available_images.append((path, ts_gmt, ts_ist))
+    #  Step 1: Check selected camera (binary search on the time-sorted index)
+    day_start, day_end = ist_day_bounds(selected_ist_date)
+    self.available_images = self.frames.between(day_start, day_end)
 
     #  If selected camera has images → build hours & stop
-    if self.available_images:
-        ist_hours = sorted(set(ist.replace(minute=0, second=0, microsecond=0) 
-                               for _, _, ist in self.available_images))
-        self.hour_label_map = {}
-        display = []
-        for h in ist_hours:
-            start_label = h.strftime("%I:%M%p")
-            end_label = (h + timedelta(hours=1)).strftime("%I:%M%p")
-            label = f"{start_label} - {end_label}"
-            self.hour_label_map[label] = h
-            display.append(label)
-
+    index = get_image_index()
+    if len(self.available_images):
+        self.hour_label_map, display = build_hour_labels(self.camera_path, selected_ist_date)
         self.hour_spinner.text = "Select Hour"
-        self.hour_spinner.values = display if display else []
+        self.hour_spinner.values = hour_spinner_values(display)
         return
 
     #  Step 2: Selected camera empty → check all cameras
+    #  (histograms built by the warm-up only; scanning is never done on the UI thread)
     available_cams = []
+    indexing_cams = []
     for cam_clean, real_folder in self.camera_map.items():
-        camera_path = os.path.join(self.camera_root, real_folder)
-        for root, _, files in os.walk(camera_path):
-            for f in files:
-                if f.lower().endswith((".jpg", ".jpeg", ".png")):
-                    ts_gmt = extract_timestamp_from_filename(f)
-                    if not ts_gmt:
-                        ts_gmt = datetime.utcfromtimestamp(
-                            os.path.getmtime(os.path.join(root, f))
-                        )
-                    ts_ist = ts_gmt + IST_OFFSET
-                    if ts_ist.strftime("%Y-%m-%d") == selected_ist_date:
-                        available_cams.append(cam_clean)
-                        break
-            if cam_clean in available_cams:
-                break
+        hist = index.histogram_snapshot(os.path.join(self.camera_root, real_folder))
+        if hist is None:
+            indexing_cams.append(cam_clean)
+        elif hist.has_date(selected_ist_date):
+            available_cams.append(cam_clean)
+    still_indexing = (f"\nStill indexing: {', '.join(indexing_cams)}." if indexing_cams else "")
 
     #  Step 3: Popup message
     if available_cams:
         cams_str = ", ".join(available_cams)
         self.show_popup(
             f"This camera has no images for {selected_ist_date}.\n"
-            f"Images are available in: {cams_str}."      
+            f"Images are available in: {cams_str}." + still_indexing
         )
         self.camera_spinner.text = "Select Camera"
     else:
-        self.show_popup(f"No images found for {selected_ist_date}.")
+        self.show_popup(f"No images found for {selected_ist_date}." + still_indexing)
 
 
 def on_device_selected(self, value):
@@ -173,30 +267,60 @@ def on_device_selected(self, value):
     self.external_device_path = value
     if value and not value.upper().startswith("SELECT") and not value.upper().startswith("NO"):
         Clock.schedule_once(lambda dt: show_snackbar(f"Device selected: {self.external_device_path}", duration=1), 0)
+def _handle_device_lost(self, device):
+    """Abort the running export and tell the user (UI thread)."""
+    if getattr(self, "device_lost_handled", False):
+        return
+    self.device_lost_handled = True
+    self.abort_event.set()
+    stop_device_monitor(self)
+    self.hide_loading()
+
+    # 🔹 Dismiss overwrite popup if it’s still open
+    if hasattr(self, "active_overwrite_popup") and self.active_overwrite_popup:
+        try:
+            self.active_overwrite_popup.dismiss()
+        except Exception as e:
+            logger.warning("Failed to dismiss overwrite popup: %s", e)
+        self.active_overwrite_popup = None
+
+    self.show_popup("Device disconnected. Please re-select device.")
+    logger.warning("Device %s disconnected.", device)
+
+
 def start_device_monitor(self):
-    def check_device(dt):
+    """
+    Watch the export device: checks run on every mount-table change and,
+    as a safety net, every DEVICE_CHECK_INTERVAL seconds (0 disables).
+    A fresh abort_event is created for each export; the writer checks it
+    between frames.
+    """
+    stop_device_monitor(self)
+    self.abort_event = threading.Event()
+    self.device_lost_handled = False
+
+    def check_device(dt=None):
         device = self.device_spinner.text
         if device and not is_device_available(device):
-            self.abort_processing = True
-            self.hide_loading()
-
-            # 🔹 Dismiss overwrite popup if it’s still open
-            if hasattr(self, "active_overwrite_popup") and self.active_overwrite_popup:
-                try:
-                    self.active_overwrite_popup.dismiss()
-                except Exception as e:
-                    logger.warning("Failed to dismiss overwrite popup: %s", e)
-                self.active_overwrite_popup = None
-
-            self.show_popup("Device disconnected. Please re-select device.")
-            logger.warning("Device %s disconnected.", device)
+            _handle_device_lost(self, device)
             return False  # stop the interval
 
-    # check every 0.2 seconds
-    self.abort_processing = False 
-    self.device_monitor_event = Clock.schedule_interval(check_device, 0.2)
+    def on_mount_change(devices):
+        Clock.schedule_once(check_device, 0)
+
+    self.device_monitor_callback = on_mount_change
+    if getattr(self, "mount_watcher", None) is not None:
+        self.mount_watcher.subscribe(on_mount_change)
+    if DEVICE_CHECK_INTERVAL:
+        self.device_monitor_event = Clock.schedule_interval(check_device, DEVICE_CHECK_INTERVAL)
+
 
 def stop_device_monitor(self):
+    callback = getattr(self, "device_monitor_callback", None)
+    if callback is not None:
+        if getattr(self, "mount_watcher", None) is not None:
+            self.mount_watcher.unsubscribe(callback)
+        self.device_monitor_callback = None
     if hasattr(self, "device_monitor_event") and self.device_monitor_event is not None:
         self.device_monitor_event.cancel()
         self.device_monitor_event = None
@@ -204,7 +328,8 @@ def stop_device_monitor(self):
 
 
 
-def process_images(self):
+def _check_selection(self, need_device=True):
+    """Popup listing the fields still to pick; True when everything needed is selected."""
     device = self.device_spinner.text
     camera = self.camera_spinner.text
     date_val = self.start_date
@@ -215,7 +340,7 @@ def process_images(self):
 
     # 🟢 Collect all missing fields
     missing = []
-    if is_select_or_no(device):
+    if need_device and is_select_or_no(device):
         missing.append("Device")
     if is_select_or_no(camera):
         missing.append("Camera")
@@ -231,185 +356,181 @@ def process_images(self):
         else:
             msg = "Please select: " + ", ".join(missing[:-1]) + f" and {missing[-1]}"
         self.show_popup(msg, reset_ui=False)
+        return False
+    return True
+
+
+def _selected_hour_labels(self):
+    """Hour labels behind the hour spinner ("All Hours" → every hour of the day), or None."""
+    hour_label = self.hour_spinner.text
+    if hour_label == ALL_HOURS_LABEL:
+        return list(self.hour_label_map)
+    if hour_label in self.hour_label_map:
+        return [hour_label]
+    return None
+
+
+def _hour_selections(self, camera, hour_labels):
+    """[(camera, hour label, frames)]; incidents are kept whole across hour boundaries."""
+    starts = [ist_to_epoch(self.hour_label_map[label]) for label in hour_labels]
+    selected = select_hours(self.frames, [(start, start + 3600) for start in starts], policy_for(camera))
+    return [(camera, label, frames) for label, frames in zip(hour_labels, selected)]
+
+
+def process_images(self, chosen=None):
+    """
+    Export the selected hour(s). chosen: {(camera, hour label):
+    [IncidentSummary]} from the incident preview to export only those clips.
+    """
+    if not _check_selection(self):
         return
+    # Kept on the widget so overwrite/resume re-runs export the same incidents
+    self.chosen_incidents = chosen
 
     # ✅ If everything is selected
     Clock.schedule_once(lambda dt: self.show_loading("Checking incidents..."), 0)
     start_device_monitor(self)   # not self.start_device_monitor()
 
-    threading.Thread(target=lambda: _process_images_thread(self), daemon=True).start()
-
-
-def _process_images_thread(self):
-    """Run heavy OpenCV/image grouping work in background."""
-    try:
-        _process_images_deferred(self)
-    except Exception as e:
-        Clock.schedule_once(lambda dt, err=e: self.show_popup(f"Error: {err}"), 0)
+    start_export(self)
 
-    finally:
-        Clock.schedule_once(lambda dt: self.hide_loading(), 0)
 
-def _process_images_deferred(self):
+def start_export(self, resume=False):
+    """
+    Build an ExportJob from the current selection and run it in the
+    background (UI thread: widget state is only read here). The screen
+    follows the job through its events; abort_event is its cancel token.
+    """
     device = self.device_spinner.text
     camera = self.camera_spinner.text
     date_val = self.start_date
     hour_label = self.hour_spinner.text
 
-    # 🔹 Abort early if device already flagged as disconnected
-    if getattr(self, "abort_processing", False):
-        logger.warning("Processing aborted before start (device disconnected).")
-        return
-
-    if hour_label not in self.hour_label_map:
+    hour_labels = _selected_hour_labels(self)
+    if hour_labels is None:
         Clock.schedule_once(lambda dt: self.hide_loading(), 0)
         Clock.schedule_once(lambda dt: self.show_popup("Invalid hour selected."), 0)
-        return
-
-    ist_start = self.hour_label_map[hour_label]
-    ist_end = ist_start + timedelta(hours=1)
+        return None
 
-    selected = [(p, gmt) for p, gmt, ist in self.available_images if ist_start <= ist < ist_end]
-    if not selected:
-        Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-        Clock.schedule_once(lambda dt: self.show_popup("No images found for selection."), 0)
-        return
-
-    if getattr(self, "abort_processing", False):
-        logger.warning("Processing aborted after image selection.")
-        return
+    scale = RESOLUTION_LABELS.get(self.resolution_spinner.text, EXPORT_SCALE)
+    job = ExportJob(device, {date_val: _hour_selections(self, camera, hour_labels)}, scale=scale,
+                    chosen=self.chosen_incidents, resume=resume, cancel=self.abort_event)
+    job.subscribe(lambda event: Clock.schedule_once(
+        lambda dt: _on_export_event(self, job, event, camera, hour_label), 0))
+    self.export_job = job
+    return job.start()
 
-    groups = group_images_by_incident(selected, gap_seconds=30)
-    filtered_groups = [g for g in groups if len(g) >= 2]
 
-    if not filtered_groups:
-        Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-        Clock.schedule_once(lambda dt: self.show_popup("No incidents found."), 0)
+def preview_incidents(self):
+    """Show the incidents of the selected hour(s) on the incident screen."""
+    if not _check_selection(self, need_device=False):
         return
-
-    # 🟢 Free-space pre-check
-    total_required = sum(estimate_group_size(g) for g in filtered_groups)
-    free_space = get_free_space_bytes(device)
-    if free_space < total_required:
-        stop_device_monitor(self)
-        Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-        Clock.schedule_once(lambda dt: self._show_space_warning_popup(
-            total_required, free_space, filtered_groups, device, camera, date_val, hour_label
-        ), 0)
+    camera = self.camera_spinner.text
+    hour_labels = _selected_hour_labels(self)
+    if hour_labels is None:
+        self.show_popup("Invalid hour selected.", reset_ui=False)
         return
 
-    if getattr(self, "abort_processing", False):
-        logger.warning("Processing aborted before folder creation.")
+    # Segmenting is a pass over the timestamp array; no images are read here
+    policy = policy_for(camera)
+    hours = [(label, incident_summaries(frames, policy))
+             for _, label, frames in _hour_selections(self, camera, hour_labels)]
+    if not any(summaries for _, summaries in hours):
+        self.show_popup("No incidents found.", reset_ui=False)
         return
+    self.incident_screen.show_incidents(camera, self.start_date, hours)
+    self.screen_manager.current = "incidents"
 
-    safe_date = date_val
-    system_name = f"Vehicle_{get_nuc_identifier()}"
-    dest_root = os.path.join(device, "Cognitica AI")
-    os.makedirs(dest_root, exist_ok=True)
-
-    system_folder = os.path.join(dest_root, system_name)
-    os.makedirs(system_folder, exist_ok=True)
-
-    date_folder = os.path.join(system_folder, safe_date)
-    os.makedirs(date_folder, exist_ok=True)
 
-    # Build hour + camera folders
-    hour_folder_name = hour_label.replace(" ", "").replace(":", ".").replace("-", "_to_")
-    hour_folder = os.path.join(date_folder, hour_folder_name)
-    os.makedirs(hour_folder, exist_ok=True)
-
-    camera_folder = os.path.join(hour_folder, camera)
-
-    # 🔹 Overwrite check
-    if os.path.exists(camera_folder): 
-        Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-        Clock.schedule_once(lambda dt: self._show_overwrite_popup(
-            f"{camera} already has incidents for {hour_label}. Do you want to overwrite them?",
-            camera_folder, device, hour_folder
-        ), 0)
+def _on_export_event(self, job, event, camera, hour_label):
+    """Turn ExportJob events into loading text and popups (UI thread)."""
+    device = job.device
+    if isinstance(event, Planned):
+        # ✅ Switch to "Processing incidents..."
+        self.hide_loading()
+        self.show_loading("Processing incidents...")
+    elif isinstance(event, Progress):
+        speed = f"\nCopying to device at {event.mb_per_s:.1f} MB/s" if event.mb_per_s else ""
+        self.update_loading(f"Processing incidents...\n{event.done} of {event.total} done{speed}")
+    elif isinstance(event, SpaceShort):
+        stop_device_monitor(self)
+        self.hide_loading()
+        self._show_space_warning_popup(
+            event.required, event.free, None, device, camera, self.start_date, hour_label)
+    elif isinstance(event, FoldersExist):
+        # 🔹 Overwrite check (one popup for every folder of the job)
+        if len(event.folders) == 1 and hour_label != ALL_HOURS_LABEL:
+            msg = f"{camera} already has incidents for {hour_label}. Do you want to overwrite them?"
+        else:
+            msg = (f"{camera} already has incidents for {len(event.folders)} of the "
+                   f"selected hours. Do you want to overwrite them?")
+        self.hide_loading()
+        self._show_overwrite_popup(
+            msg + ("\nResume continues the unfinished export." if event.resumable else ""),
+            event.folders, device, event.date_folders[0], resumable=event.resumable)
+    elif isinstance(event, Finished):
+        _on_export_finished(self, job, event, camera, hour_label)
+
+
+def _on_export_finished(self, job, result, camera, hour_label):
+    device = job.device
+    if result.status in ("exists", "no_space"):
+        return  # popup already shown for the preceding event
+    if result.status != "done":
+        self.hide_loading()
+        if result.status == "no_images":
+            self.show_popup("No images found for selection.")
+        elif result.status == "no_incidents":
+            self.show_popup("No incidents found.")
+        elif result.status == "error":
+            self.show_popup(f"Error: {result.error}")
+        elif result.status == "device_lost":
+            _handle_device_lost(self, device)  # no-op if the device monitor got there first
+        else:
+            logger.warning("Processing aborted while saving incidents.")
         return
 
-    # ✅ Switch to "Processing incidents..."
-    Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-    Clock.schedule_once(lambda dt: self.show_loading("Processing incidents..."), 0)
-
-    os.makedirs(camera_folder, exist_ok=True)
-
-    saved_files = []
-    for idx, g in enumerate(sorted(filtered_groups, key=lambda grp: grp[0][1]), start=1):
-
-        if getattr(self, "abort_processing", False):
-            logger.warning("Processing aborted while saving incident %d.", idx)
-            return
-
-        # 🟢 Per-incident space check
-        required_space = estimate_group_size(g)
-        free_space = get_free_space_bytes(device)
-        if free_space < required_space:
-            stop_device_monitor(self)
-            Clock.schedule_once(lambda dt: self.hide_loading(), 0)
-            Clock.schedule_once(lambda dt: self.show_popup(
-                f"Device ran out of space while saving incident {idx}.\n"
-                f"Required ~{required_space // (1024*1024)} MB, "
-                f"Available ~{free_space // (1024*1024)} MB.\n"
-                f"Only {len(saved_files)} incident(s) were saved."
-            ), 0)
-            logger.error("Out of space on incident %d: need %d MB, have %d MB",
-                         idx, required_space // (1024*1024), free_space // (1024*1024))
-            return
-
-        start_ist = (g[0][1] + IST_OFFSET).strftime("%I.%M.%S%p")
-        end_ist = (g[-1][1] + IST_OFFSET).strftime("%I.%M.%S%p")
-        safe_name = f"incident_{idx}_{start_ist}_to_{end_ist}.mp4"
-        full_out = os.path.join(camera_folder, safe_name)
-
-        imgs = [(p, ts) for p, ts in g]
-        success, error_msg = create_video_from_image_paths(imgs, full_out, fps=5)
-        if success:
-            saved_files.append(full_out)
-        else:
-            if not getattr(self, "abort_processing", False):
-                Clock.schedule_once(lambda dt: self.show_popup(
-                    f"Could not create video for {camera} ({hour_label})."
-                    # f"Check logs for details: {error_msg}"
-                ), 0)
-            logger.error("Failed to create incident video %s: %s", full_out, error_msg)
-    def finalize(dt):
-        # 🔹 Skip final popups if aborted
-        if getattr(self, "abort_processing", False):
-            logger.info("Finalize skipped due to device disconnect.")
-            self.hide_loading()  # make sure loading spinner is closed
-            return
+    saved_files = result.saved_files
+    if result.failures:
+        self.show_popup(f"Could not create video for {camera} ({hour_label}).")
 
+    # 🟢 Per-incident space check failed part-way
+    if result.out_of_space:
+        idx, required_space, free_space = result.out_of_space
+        stop_device_monitor(self)
         self.hide_loading()
+        self.show_popup(
+            f"Device ran out of space while saving incident {idx}.\n"
+            f"Required ~{required_space // (1024*1024)} MB, "
+            f"Available ~{free_space // (1024*1024)} MB.\n"
+            f"Only {len(saved_files)} incident(s) were saved."
+        )
+        return
 
-        # 🔹 Verify actual files exist on disk
-        verified_files = [f for f in saved_files if os.path.exists(f) and os.path.getsize(f) > 0]
+    self.hide_loading()
 
-        if verified_files and len(verified_files) == len(saved_files):
-            #  All videos exist → success
-            msg = (
-                f"Successfully saved videos of {len(verified_files)} incident(s) "
-                f"to the selected device under the 'Cognitica AI' folder."
-            )
-            self.show_success_popup(msg, device)
-
-            logger.info(msg)
-        elif verified_files:
-            # ⚠ Partial success
-            msg = (
-                f"Only {len(verified_files)} out of {len(saved_files)} incident(s) "
-                f"were successfully copied before device disconnect."
-            )
-            self.show_popup(msg)
-            logger.warning(msg)
-        else:
-            #  None saved
-            self.show_popup("Failed to create any video files.")
-            logger.error("No valid incident videos found after processing.")
+    # 🔹 Verify actual files exist on disk
+    verified_files = [f for f in saved_files if os.path.exists(f) and os.path.getsize(f) > 0]
 
-        stop_device_monitor(self)
-    if not getattr(self, "abort_processing", False):
-        Clock.schedule_once(finalize, 0)
+    if verified_files and len(verified_files) == len(saved_files):
+        #  All videos exist → success
+        msg = (
+            f"Successfully saved videos of {len(verified_files)} incident(s) "
+            f"to the selected device under the 'Cognitica AI' folder."
+        )
+        self.show_success_popup(msg, device)
+
+        logger.info(msg)
+    elif verified_files:
+        # ⚠ Partial success
+        msg = (
+            f"Only {len(verified_files)} out of {len(saved_files)} incident(s) "
+            f"were successfully copied before device disconnect."
+        )
+        self.show_popup(msg)
+        logger.warning(msg)
     else:
-        logger.info("Finalize not scheduled because processing was aborted.")
\ No newline at end of file
+        #  None saved
+        self.show_popup("Failed to create any video files.")
+        logger.error("No valid incident videos found after processing.")
+
+    stop_device_monitor(self)
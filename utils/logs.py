@@ -5,10 +5,14 @@ from datetime import datetime, timedelta, timezone
 import subprocess
 import tempfile
 import re
+import multiprocessing
 
 ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
 REAL_STDERR = sys.__stderr__
 REAL_STDOUT = sys.__stdout__
+# Spawned export workers import this module too: they log to the same files
+# but leave the start banner and old-log cleanup to the app itself
+MAIN_PROCESS = multiprocessing.parent_process() is None
 
 
 # ---------------------
@@ -77,7 +81,8 @@ def clean_old_logs(folder, days=30):
                 print(f"Failed to delete old log {file}: {e}")
 
 
-clean_old_logs(LOG_DIR)
+if MAIN_PROCESS:
+    clean_old_logs(LOG_DIR)
 
 info_log_path = os.path.join(LOG_DIR, "Incident.log")
 error_log_path = os.path.join(LOG_DIR, "err.log")
@@ -182,12 +187,13 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 # ---------------------
 # Log App Start with GMT
 # ---------------------
-now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S.%f") + " GMT"
-with open(info_log_path, 'a') as f:
-    f.write('\n' + '*' * 80 + '\nAPP STARTED at ' + now + '\n')
+if MAIN_PROCESS:
+    now = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S.%f") + " GMT"
+    with open(info_log_path, 'a') as f:
+        f.write('\n' + '*' * 80 + '\nAPP STARTED at ' + now + '\n')
 
-with open(error_log_path, 'a') as f:
-    f.write('\n' + '*' * 80 + '\nAPP STARTED at ' + now + '\n')
+    with open(error_log_path, 'a') as f:
+        f.write('\n' + '*' * 80 + '\nAPP STARTED at ' + now + '\n')
 
 sys.excepthook = handle_exception
 
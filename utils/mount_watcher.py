@@ -0,0 +1,91 @@
+import os, select, threading
+from utils.config import DEVICE_POLL_INTERVAL, MOUNT_DEBOUNCE
+from utils.logs import logger
+from utils.file_utils import ensure_device_mounts
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+
+class MountWatcher:
+    """
+    Event-driven device discovery.
+
+    On Linux the kernel flags /proc/self/mountinfo with POLLPRI/POLLERR
+    whenever the mount table changes, so the watcher thread sleeps in poll()
+    and only re-runs ensure_device_mounts() after a change (debounced).
+    Elsewhere it falls back to a background poll every DEVICE_POLL_INTERVAL.
+
+    Subscribers get callback(devices) from the watcher thread after every
+    mount-table change (polling mode: only when the device set changed).
+    """
+
+    def __init__(self, poll_interval=DEVICE_POLL_INTERVAL, debounce=MOUNT_DEBOUNCE):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.devices = ensure_device_mounts()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def start(self):
+        target = self._run_mountinfo if os.path.exists(MOUNTINFO_PATH) else self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        logger.info("Mount watcher started (%s)",
+                    "mountinfo" if target == self._run_mountinfo else "polling")
+
+    def stop(self):
+        self._stop.set()
+
+    def _notify(self, devices):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(devices)
+            except Exception:
+                logger.exception("Mount watcher callback failed")
+
+    def _rescan(self, always_notify):
+        devices = ensure_device_mounts()
+        changed = set(devices) != set(self.devices)
+        self.devices = devices
+        if changed:
+            logger.info("Devices changed: %s", devices)
+        if changed or always_notify:
+            self._notify(devices)
+
+    def _run_mountinfo(self):
+        try:
+            with open(MOUNTINFO_PATH, "rb") as f:
+                poller = select.poll()
+                poller.register(f, select.POLLPRI | select.POLLERR)
+                f.read()
+                while not self._stop.is_set():
+                    if not poller.poll(1000):
+                        continue
+                    # Let the automounter finish (mount + remount rw) before looking
+                    self._stop.wait(self.debounce)
+                    f.seek(0)
+                    f.read()
+                    self._rescan(always_notify=True)
+        except Exception as e:
+            logger.warning("mountinfo watch failed (%s); falling back to polling", e)
+            self._run_polling()
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._rescan(always_notify=False)
+            except Exception as e:
+                logger.warning("Device poll failed: %s", e)
@@ -0,0 +1,106 @@
+from collections import namedtuple
+import numpy as np
+from utils.config import SEGMENT_POLICY, CAMERA_SEGMENT_POLICIES
+from utils.image_index import iter_incident_ranges
+
+SegmentPolicy = namedtuple("SegmentPolicy", "gap_seconds min_frames max_duration merge_across_hours")
+# One clip as plan_export will write it: number as in incident_<number>_..., start/end
+# GMT epoch seconds, frame count and the path of its middle frame (for previews)
+IncidentSummary = namedtuple("IncidentSummary", "number start end frames keyframe")
+
+
+def policy_for(camera=None, **overrides):
+    """SEGMENT_POLICY with the camera's CAMERA_SEGMENT_POLICIES entry and overrides applied."""
+    settings = dict(SEGMENT_POLICY)
+    settings.update(CAMERA_SEGMENT_POLICIES.get(camera, {}))
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    # 0 means "never split", like None (a zero span would also stop cross-hour merging)
+    if not settings["max_duration"]:
+        settings["max_duration"] = None
+    policy = SegmentPolicy(**settings)
+    if policy.min_frames < 1:
+        raise ValueError(f"min_frames must be at least 1, got {policy.min_frames}")
+    if policy.max_duration is not None and policy.max_duration < 0:
+        raise ValueError(f"max_duration must not be negative, got {policy.max_duration}")
+    return policy
+
+
+def _split(ts, lo, hi, max_duration, min_frames):
+    """Cut ts[lo:hi] into pieces spanning at most max_duration seconds each."""
+    t0 = ts[lo]
+    steps = np.arange(1, int((ts[hi - 1] - t0) // max_duration) + 1)
+    cuts = (np.searchsorted(ts[lo:hi], t0 + steps * max_duration, side="left") + lo).tolist()
+    # Steps shorter than the frame spacing land on the same index; keep each cut once
+    bounds = [lo] + sorted({c for c in cuts if lo < c < hi}) + [hi]
+    pieces = list(zip(bounds[:-1], bounds[1:]))
+    # A last piece too short to export is kept with the one before it
+    if len(pieces) > 1 and pieces[-1][1] - pieces[-1][0] < min_frames:
+        (a, _), (_, b) = pieces[-2], pieces[-1]
+        pieces[-2:] = [(a, b)]
+    return pieces
+
+
+def segment_ranges(ts, policy):
+    """
+    (start, end) index ranges of the clips to export from time-sorted epoch
+    seconds: gap split, max_duration split, then the min_frames filter.
+    """
+    ranges = []
+    for lo, hi in iter_incident_ranges(ts, policy.gap_seconds):
+        if policy.max_duration and ts[hi - 1] - ts[lo] > policy.max_duration:
+            pieces = _split(ts, lo, hi, policy.max_duration, policy.min_frames)
+        else:
+            pieces = [(lo, hi)]
+        ranges += [(a, b) for a, b in pieces if b - a >= policy.min_frames]
+    return ranges
+
+
+def incident_summaries(frames, policy):
+    """IncidentSummary per clip that plan_export makes from frames (a CameraFrames)."""
+    return [IncidentSummary(number, float(frames.ts[lo]), float(frames.ts[hi - 1]), hi - lo,
+                            frames.paths[(lo + hi - 1) // 2])
+            for number, (lo, hi) in enumerate(segment_ranges(frames.ts, policy), start=1)]
+
+
+def segment_stats(ts, policy):
+    """Summary of what policy makes of ts, for tuning (no images are touched)."""
+    ts = np.asarray(ts, dtype=np.float64)
+    ranges = segment_ranges(ts, policy)
+    incidents = sum(1 for _ in iter_incident_ranges(ts, policy.gap_seconds))
+    frames = sum(b - a for a, b in ranges)
+    durations = np.array([ts[b - 1] - ts[a] for a, b in ranges]) if ranges else np.zeros(1)
+    return {
+        "frames": len(ts),
+        "incidents": incidents,
+        "clips": len(ranges),
+        "exported_frames": frames,
+        "dropped_frames": len(ts) - frames,
+        "duration_median": float(np.median(durations)),
+        "duration_p95": float(np.percentile(durations, 95)),
+        "duration_max": float(durations.max()),
+    }
+
+
+def select_hours(frames, bounds, policy):
+    """
+    Frames to export for each (start, end) hour of one job, in the order of
+    bounds. With merge_across_hours the selections follow incident
+    boundaries: an incident running over an hour's end stays with the hour
+    it starts in (up to max_duration, see incident_range_indices), and the
+    next hour skips those frames only when it is part of the same job, so an
+    hour exported on its own keeps all of its footage. frames should be the
+    camera's full CameraFrames so the neighbouring hours can be seen.
+    """
+    selections = [None] * len(bounds)
+    prev_end = prev_hi = None
+    for n in sorted(range(len(bounds)), key=lambda k: bounds[k][0]):
+        start, end = bounds[n]
+        if policy.merge_across_hours:
+            after = prev_hi if prev_end == start else None
+            lo, hi = frames.incident_range_indices(start, end, policy.gap_seconds,
+                                                   policy.max_duration, after)
+        else:
+            lo, hi = frames.range_indices(start, end)
+        selections[n] = frames[lo:hi]
+        prev_end, prev_hi = end, hi
+    return selections
@@ -0,0 +1,129 @@
+import os, json, threading
+from utils.config import SIZE_MODEL_PATH
+from utils.logs import logger
+
+# Output bytes per input JPEG byte before anything has been learned
+# (deliberately on the high side; measured mp4v ≈ 0.27, MJPG ≈ 0.57 at full size)
+PRIOR_RATIOS = {
+    "passthrough": 1.01,
+    "mjpg": 0.8,
+    "mp4v": 0.45,
+    "h264": 0.3,
+}
+DEFAULT_PRIOR = 1.1
+SAFETY_MARGIN = 1.15   # headroom on top of a learned ratio
+LEARNING_RATE = 0.3    # weight of the newest export in the running average
+MIN_INPUT_BYTES = 1024 * 1024  # tiny incidents say more about headers than the codec
+
+
+class SizeModel:
+    """
+    Learns how big exported videos get relative to their input JPEGs, per
+    camera, codec (or "passthrough") and export scale, and persists it in
+    SIZE_MODEL_PATH.
+
+    ratios: "<camera>|<codec>|<scale>" → {"ratio": output/input bytes, "samples": n}
+    """
+
+    def __init__(self, path=SIZE_MODEL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.ratios = json.load(f)
+        except (OSError, ValueError):
+            self.ratios = {}
+
+    @staticmethod
+    def key(camera, codec, scale):
+        return f"{camera}|{codec}|{scale}"
+
+    def ratio(self, camera, codec, scale):
+        """(output/input byte ratio incl. margin, learned?) for this export setting."""
+        entry = self.ratios.get(self.key(camera, codec, scale))
+        if entry:
+            return entry["ratio"] * SAFETY_MARGIN, True
+        # Encoded frames shrink with the pixel count; passthrough keeps the JPEGs
+        prior = PRIOR_RATIOS.get(codec, DEFAULT_PRIOR)
+        return (prior if codec == "passthrough" else prior / (scale * scale)), False
+
+    def observe(self, camera, codec, scale, input_bytes, output_bytes):
+        """Fold one finished export into the running ratio and persist it."""
+        if input_bytes < MIN_INPUT_BYTES or output_bytes <= 0:
+            return
+        key = self.key(camera, codec, scale)
+        observed = output_bytes / input_bytes
+        with self._lock:
+            entry = self.ratios.get(key)
+            if entry:
+                entry["ratio"] += LEARNING_RATE * (observed - entry["ratio"])
+                entry["samples"] += 1
+            else:
+                self.ratios[key] = entry = {"ratio": observed, "samples": 1}
+            self._save()
+        logger.debug("Size model %s: observed %.3f, now %.3f", key, observed, entry["ratio"])
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.ratios, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning("Could not save size model: %s", e)
+
+    def sizer(self, camera, codec, scale, sizes=None):
+        """IncidentSizer for one export (sizes: path → bytes, e.g. from the scan index)."""
+        return IncidentSizer(self, camera, codec, scale, sizes or {})
+
+
+class IncidentSizer:
+    """
+    Estimates and calibrates incident output sizes for one export setting.
+    Input sizes come from `sizes` (the image index already has them), so
+    estimating does not stat the images again; unknown paths fall back to
+    os.path.getsize.
+    """
+
+    def __init__(self, model, camera, codec, scale, sizes):
+        self.model = model
+        self.camera = camera
+        self.codec = codec
+        self.scale = scale
+        self.sizes = sizes
+
+    def input_bytes(self, group):
+        total = 0
+        for path, _ in group:
+            size = self.sizes.get(path)
+            if not size:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    size = 0
+            total += size
+        return total
+
+    def estimate(self, group):
+        """Expected output bytes for a group of (path, timestamp)."""
+        if not group:
+            return 0
+        ratio, _ = self.model.ratio(self.camera, self.codec, self.scale)
+        return int(self.input_bytes(group) * ratio) + 64 * 1024  # container overhead
+
+    def observe(self, group, output_bytes):
+        self.model.observe(self.camera, self.codec, self.scale, self.input_bytes(group), output_bytes)
+
+
+_size_model = None
+_size_model_lock = threading.Lock()
+
+
+def get_size_model():
+    """Return the process-wide SizeModel (loaded on first use)."""
+    global _size_model
+    with _size_model_lock:
+        if _size_model is None:
+            _size_model = SizeModel()
+        return _size_model
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from kivy.graphics.texture import Texture
+
+
+class TexturePool:
+    """
+    A bounded set of same-size textures shared by all thumbnails.
+
+    put() uploads pixels with blit_buffer into a free texture, or recycles
+    the least recently used one once `capacity` textures exist, so GPU memory
+    stays fixed however many incidents a list holds. Keep capacity above the
+    number of thumbnails on screen at once. UI thread only.
+    """
+
+    def __init__(self, capacity, size, colorfmt="rgb"):
+        self.capacity = capacity
+        self.size = size  # (width, height)
+        self.colorfmt = colorfmt
+        self._textures = OrderedDict()  # key → Texture, least recently used first
+        self._free = []
+
+    def get(self, key):
+        """Texture holding key (now most recently used), or None."""
+        texture = self._textures.get(key)
+        if texture is not None:
+            self._textures.move_to_end(key)
+        return texture
+
+    def put(self, key, pixels):
+        """
+        Upload pixels (height x width x 3 uint8, top row first) for key.
+        Returns (texture, evicted key or None).
+        """
+        evicted = None
+        texture = self._textures.pop(key, None)
+        if texture is None:
+            if self._free:
+                texture = self._free.pop()
+            elif len(self._textures) >= self.capacity:
+                evicted, texture = self._textures.popitem(last=False)
+            else:
+                texture = Texture.create(size=self.size, colorfmt=self.colorfmt)
+                texture.flip_vertical()  # rows arrive top first
+        texture.blit_buffer(pixels.tobytes(), colorfmt=self.colorfmt, bufferfmt="ubyte")
+        self._textures[key] = texture
+        return texture, evicted
+
+    def clear(self):
+        """Forget every key; the textures stay allocated for reuse."""
+        self._free.extend(self._textures.values())
+        self._textures.clear()
@@ -0,0 +1,190 @@
+import os, queue, hashlib, threading
+import cv2
+import numpy as np
+from utils.config import THUMB_CACHE_DIR, THUMB_CACHE_MAX_BYTES, THUMB_WIDTH, THUMB_HEIGHT
+from utils.logs import logger
+from utils.avi_writer import jpeg_dimensions
+from utils.video_utils import IMREAD_FLAGS
+
+THUMB_QUALITY = 80
+PRUNE_TO = 0.9  # after pruning, the cache holds at most this share of max_bytes
+
+
+def thumbnail_pixels(thumb, width=THUMB_WIDTH, height=THUMB_HEIGHT):
+    """
+    RGB uint8 array (height, width, 3), top row first, of a cached thumbnail
+    letterboxed on white; ready for Texture.blit_buffer. None if unreadable.
+    """
+    img = cv2.imread(thumb, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    fit = min(width / w, height / h)
+    fw, fh = max(1, int(w * fit)), max(1, int(h * fit))
+    if (fw, fh) != (w, h):
+        img = cv2.resize(img, (fw, fh), interpolation=cv2.INTER_AREA)
+    pixels = np.full((height, width, 3), 255, dtype=np.uint8)
+    top, left = (height - fh) // 2, (width - fw) // 2
+    pixels[top:top + fh, left:left + fw] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return pixels
+
+
+class ThumbnailCache:
+    """
+    On-disk LRU cache of small JPEG thumbnails.
+
+    Entries are keyed by source path + mtime + size, so a replaced image gets
+    a fresh thumbnail. A thumbnail file's mtime is its last use; once the
+    cache grows past max_bytes the least recently used files are deleted.
+    JPEGs are decoded at reduced resolution (IMREAD_REDUCED_*), never at
+    full size. request() makes thumbnails on a background thread.
+    """
+
+    def __init__(self, cache_dir=THUMB_CACHE_DIR, max_bytes=THUMB_CACHE_MAX_BYTES, width=THUMB_WIDTH):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.width = width
+        self._lock = threading.Lock()
+        self._total = None  # bytes in cache_dir, counted on first write
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def thumb_path(self, path):
+        """Cache file for path (raises OSError if path is gone)."""
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".jpg")
+
+    def get(self, path):
+        """Cached thumbnail file for path (now most recently used), or None."""
+        try:
+            thumb = self.thumb_path(path)
+            os.utime(thumb)
+            return thumb
+        except OSError:
+            return None
+
+    def make(self, path):
+        """Thumbnail file for path, decoding the image if it is not cached; None if unreadable."""
+        thumb = self.get(path)
+        if thumb:
+            return thumb
+        try:
+            thumb = self.thumb_path(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning("Thumbnail skipped for %s: %s", path, e)
+            return None
+
+        # Largest JPEG reduction that still leaves at least self.width pixels
+        dims = jpeg_dimensions(data)
+        reduction = 1
+        if dims:
+            reduction = max([r for r in IMREAD_FLAGS if dims[0] // r >= self.width] or [1])
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), IMREAD_FLAGS[reduction])
+        if img is None:
+            logger.warning("Thumbnail skipped for %s: not a readable image", path)
+            return None
+        h, w = img.shape[:2]
+        if w > self.width:
+            img = cv2.resize(img, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+        if not ok:
+            return None
+
+        tmp = f"{thumb}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(buf.tobytes())
+            os.replace(tmp, thumb)
+        except OSError as e:
+            logger.warning("Could not write thumbnail for %s: %s", path, e)
+            return None
+        self._added(len(buf))
+        return thumb
+
+    def _added(self, nbytes):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(e.stat().st_size for e in os.scandir(self.cache_dir) if e.is_file())
+            else:
+                self._total += nbytes
+            if self._total > self.max_bytes:
+                self._prune()
+
+    def _prune(self):
+        """Delete least recently used thumbnails down to PRUNE_TO * max_bytes (lock held)."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            try:
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+            except OSError:
+                pass
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes * PRUNE_TO:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._total = total
+        logger.info("Thumbnail cache pruned: %d removed, %d MB kept", removed, total // (1024*1024))
+
+    # -- background generation --
+    def request(self, paths, callback):
+        """
+        Queue thumbnails for paths; callback(path, thumb_or_None) is called
+        for each one from the worker thread (UI code must hop threads).
+        """
+        with self._thread_lock:
+            for path in paths:
+                self._queue.put((path, callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+
+    def cancel_pending(self):
+        """Drop queued requests (e.g. the screen showing them was left)."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def _worker(self):
+        while True:
+            try:
+                path, callback = self._queue.get(timeout=5)
+            except queue.Empty:
+                # Idle: exit unless request() queued something meanwhile
+                with self._thread_lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            try:
+                callback(path, self.make(path))
+            except Exception:
+                logger.exception("Thumbnail callback failed for %s", path)
+
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Return the process-wide ThumbnailCache (created on first use)."""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
@@ -17,15 +17,32 @@ import glob
 from kivy.clock import Clock
 from kivy.uix.spinner import Spinner, SpinnerOption
 from kivy.uix.widget import Widget
+from kivy.uix.checkbox import CheckBox
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recyclegridlayout import RecycleGridLayout
 import shutil, errno, logging
 from kivy.uix.scrollview import ScrollView
 from kivy.graphics import Color, Rectangle, RoundedRectangle
 from kivy.utils import get_color_from_hex
 from kivy.core.text import LabelBase
 from utils.file_utils import ensure_device_mounts,clean_camera_name
-from utils.config import LOCAL_PROJECT_ROOT,IST_OFFSET,BG_COLOR,arial_path,resource_path
+from utils.config import LOCAL_PROJECT_ROOT,IST_OFFSET,arial_path,resource_path
+from utils.config import THUMB_WIDTH, THUMB_HEIGHT, TEXTURE_POOL_SIZE
 from utils.logs import logger
+from utils.image_index import CameraFrames, get_image_index, epoch_to_ist
+from utils.thumbnail_cache import get_thumbnail_cache, thumbnail_pixels
+from utils.texture_pool import TexturePool
+from utils.mount_watcher import MountWatcher
 import threading
+
+# Font
+if os.path.exists(arial_path):
+    LabelBase.register(name="Arial", fn_regular=arial_path)
+
+# Colors
+BG_COLOR = get_color_from_hex("#ADB3AD")
+
 from utils.logic import(
     get_camera_folders,
     on_camera_selected,
@@ -33,10 +50,13 @@ from utils.logic import(
     on_device_selected,
     on_date_selected,
     process_images,
-    _process_images_thread,
-    _process_images_deferred,
+    preview_incidents,
+    RESOLUTION_LABELS,
+    resolution_label,
+    start_export,
     stop_device_monitor,
-    eject_device
+    eject_device,
+    warm_camera_index
 )
 def show_snackbar(message,duration=2):
     MDSnackbar(
@@ -124,10 +144,18 @@ class SelectionScreen(BoxLayout):
         super().__init__(orientation="vertical", **kwargs)
         self.screen_manager = screen_manager
         self.external_device_path = ""
-        self.available_images = []  # tuples (img_path, gmt_ts, ist_ts)
+        self.available_images = CameraFrames.empty()  # selected day, time-sorted
         self.hour_label_map = {}
         self.camera_root = LOCAL_PROJECT_ROOT
         self.start_date = None 
+        self.camera_path = None
+        self.scanning = False      # camera scan running in background
+        self.scan_cancel = None    # threading.Event of that scan
+        self.fs_watcher = None     # keeps the image index live
+        self.pending_index_changes = []
+        self.abort_event = threading.Event()  # set on device disconnect, checked per frame
+        self.chosen_incidents = None  # incidents picked on the incident screen (None = all)
+        self.incident_screen = None   # IncidentScreen, set by the app
         
         # UI layout similar to your video(2).py
         with self.canvas.before:
@@ -197,6 +225,7 @@ class SelectionScreen(BoxLayout):
             self.show_popup(f"Camera root folder not found: {self.camera_root}")
             names, self.camera_map = ["No Camera"], {}
         self.camera_spinner.values = names
+        warm_camera_index(self)
 
 
         # self.camera_spinner.bind(text=self.on_camera_selected)
@@ -292,7 +321,33 @@ class SelectionScreen(BoxLayout):
         self.process_button.bind(pos=lambda i, v: setattr(self.process_button.bg_rect, 'pos', self.process_button.pos),
                                  size=lambda i, v: setattr(self.process_button.bg_rect, 'size', self.process_button.size))
 
-        bottom_box.add_widget(self.process_button)
+        self.preview_button = Button(text="PREVIEW",
+                                     font_size='24sp',
+                                     size_hint=(None, None),
+                                     background_normal='',
+                                     background_color=(0, 0, 0, 0),
+                                     color=(0, 0, 0, 1),
+                                     size=(dp(270), dp(60)),
+                                     on_press=lambda inst: preview_incidents(self))
+        with self.preview_button.canvas.before:
+            Color(*white)
+            self.preview_button.bg_rect = RoundedRectangle(pos=self.preview_button.pos, size=self.preview_button.size, radius=[dp(20)])
+        self.preview_button.bind(pos=lambda i, v: setattr(self.preview_button.bg_rect, 'pos', self.preview_button.pos),
+                                 size=lambda i, v: setattr(self.preview_button.bg_rect, 'size', self.preview_button.size))
+
+        # Export resolution (kept across resets; it is a preference, not part of the selection)
+        self.resolution_spinner = create_spinner(resolution_label())
+        self.resolution_spinner.values = list(RESOLUTION_LABELS)
+        self.resolution_spinner.size = (dp(220), dp(60))
+        self.resolution_spinner.text_size = (dp(180), None)
+        self.resolution_spinner.dropdown_cls.max_height = dp(120)
+
+        button_row = BoxLayout(orientation="horizontal", spacing=dp(40),
+                               size_hint=(None, None), size=(dp(840), dp(60)))
+        button_row.add_widget(self.resolution_spinner)
+        button_row.add_widget(self.preview_button)
+        button_row.add_widget(self.process_button)
+        bottom_box.add_widget(button_row)
 
         root_layout.add_widget(center_anchor)
         root_layout.add_widget(bottom_box)
@@ -300,8 +355,11 @@ class SelectionScreen(BoxLayout):
         self.add_widget(scroll)
 
         Window.bind(on_keyboard=self.on_keyboard)
-        # Clock.schedule_interval(lambda dt: self.auto_refresh_devices(), 5)
-        Clock.schedule_interval(lambda dt: auto_refresh_devices(self), 0.5)
+        # Device list follows mount-table changes instead of polling on the UI thread
+        self.mount_watcher = MountWatcher()
+        self.mount_watcher.subscribe(lambda devices: Clock.schedule_once(
+            lambda dt: auto_refresh_devices(self, devices), 0))
+        self.mount_watcher.start()
         logger.info("Selection screen initialized")
     def pick_start_date(self, instance):
         try:
@@ -310,14 +368,28 @@ class SelectionScreen(BoxLayout):
                 self.show_popup("Please select a camera before choosing a date.")
                 self.reset_ui_state()
                 return
+            if self.scanning:
+                self.show_popup("Still loading images for this camera. Please wait.", reset_ui=False)
+                return
+
+            # Days outside the camera's data range are greyed out
+            date_range = None
+            hist = get_image_index().histogram_snapshot(self.camera_path) if self.camera_path else None
+            if hist is not None:
+                date_range = hist.date_range()
+            open_on = datetime.now().date()
+            if date_range and not (date_range[0] <= open_on <= date_range[1]):
+                open_on = date_range[1]
 
             def show_calendar_picker():
                 picker = MDModalDatePicker(
-                    year=datetime.now().year,
-                    month=datetime.now().month,
-                    day=datetime.now().day,
+                    year=open_on.year,
+                    month=open_on.month,
+                    day=open_on.day,
                     mark_today=True,
                 )
+                if date_range and hasattr(picker, "min_date"):
+                    picker.min_date, picker.max_date = date_range
 
                 def on_ok(instance_date_picker):
                     date = instance_date_picker.get_date()[0]
@@ -572,8 +644,9 @@ class SelectionScreen(BoxLayout):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
         # ------------------- Overwrite Confirmation -------------------
-    def _show_overwrite_popup(self, message, folder_to_delete, external_device_path, final_folder):
-        """Popup asking whether to overwrite existing incidents folder"""
+    def _show_overwrite_popup(self, message, folders_to_delete, external_device_path, final_folder,
+                              resumable=False):
+        """Popup asking whether to overwrite existing incidents folder (or resume, if it has a manifest)"""
         def show_popup(dt):
             layout = BoxLayout(orientation='vertical', spacing=10, padding=10)
             layout.add_widget(Widget(size_hint_y=1))
@@ -590,12 +663,21 @@ class SelectionScreen(BoxLayout):
             btn_layout_outer = BoxLayout(size_hint_y=None, height=40, spacing=10)
             btn_layout_outer.add_widget(Widget())
 
-            btn_layout = BoxLayout(size_hint=(None, None), size=(420, 100), spacing=10)
+            btn_layout = BoxLayout(size_hint=(None, None), size=(630 if resumable else 420, 100), spacing=10)
             yes_btn = Button(text="Yes", size_hint=(None, None), size=(200, 60),
                              background_normal='', background_color=get_color_from_hex("#01acee"), color=(0,0,0,1))
             no_btn = Button(text="No", size_hint=(None, None), size=(200, 60),
                             background_normal='', background_color=get_color_from_hex("#01acee"), color=(0,0,0,1))
             btn_layout.add_widget(yes_btn)
+            if resumable:
+                resume_btn = Button(text="Resume", size_hint=(None, None), size=(200, 60),
+                                    background_normal='', background_color=get_color_from_hex("#01acee"), color=(0,0,0,1))
+                resume_btn.bind(on_release=lambda x: (
+                    popup.dismiss(),
+                    setattr(self, "active_overwrite_popup", None),   # clear reference
+                    self._on_confirm_resume(popup)
+                ))
+                btn_layout.add_widget(resume_btn)
             btn_layout.add_widget(no_btn)
             btn_layout_outer.add_widget(btn_layout)
             btn_layout_outer.add_widget(Widget())
@@ -613,7 +695,7 @@ class SelectionScreen(BoxLayout):
             yes_btn.bind(on_release=lambda x: (
                 popup.dismiss(),
                 setattr(self, "active_overwrite_popup", None),   # clear reference
-                self._on_confirm_overwrite(popup, folder_to_delete, external_device_path, final_folder)
+                self._on_confirm_overwrite(popup, folders_to_delete, external_device_path, final_folder)
             ))
             no_btn.bind(on_release=lambda x: (
                 popup.dismiss(),
@@ -627,17 +709,24 @@ class SelectionScreen(BoxLayout):
         Clock.schedule_once(show_popup)
 
 
-    def _on_confirm_overwrite(self, popup, folder_to_delete, external_device_path, final_folder):
+    def _on_confirm_overwrite(self, popup, folders_to_delete, external_device_path, final_folder):
         """User clicked YES → delete and re-copy"""
         popup.dismiss()
         self.hide_loading() 
         self.show_loading("Deleting existing folder...")
         threading.Thread(target=lambda: self._delete_and_copy(
-            folder_to_delete, external_device_path, final_folder
+            folders_to_delete, external_device_path, final_folder
         ), daemon=True).start()
 
-    def _delete_and_copy(self, folder_path, external_device_path, final_folder):
-        """Perform safe deletion before copying new incidents"""
+    def _on_confirm_resume(self, popup):
+        """User clicked RESUME → keep the folder, export only the missing incidents"""
+        popup.dismiss()
+        self.hide_loading()
+        self.show_loading("Checking incidents...")
+        start_export(self, resume=True)
+
+    def _delete_and_copy(self, folder_paths, external_device_path, final_folder):
+        """Perform safe deletion (of every camera/hour folder of the job) before copying new incidents"""
         def get_mount_point(path):
             while not os.path.ismount(path):
                 new_path = os.path.dirname(path)
@@ -648,15 +737,16 @@ class SelectionScreen(BoxLayout):
 
         try:
             # ✅ Check device still mounted
-            mount_point = get_mount_point(folder_path)
+            mount_point = get_mount_point(folder_paths[0])
             if not mount_point or not os.path.ismount(mount_point):
                 Clock.schedule_once(lambda dt: self.hide_loading(), 0)
                 Clock.schedule_once(lambda dt: self.show_popup("Unable to delete. Device disconnected."), 0)
                 return
 
-            if os.path.exists(folder_path):
-                shutil.rmtree(folder_path, ignore_errors=True)
-                logging.info(f"Deleted old folder: {folder_path}")
+            for folder_path in folder_paths:
+                if os.path.exists(folder_path):
+                    shutil.rmtree(folder_path, ignore_errors=True)
+                    logging.info(f"Deleted old folder: {folder_path}")
 
         except Exception as e:
             logging.error(f"Failed to delete folder: {e}")
@@ -667,8 +757,8 @@ class SelectionScreen(BoxLayout):
         # ✅ Continue with normal incident processing
         Clock.schedule_once(lambda dt: self.hide_loading(), 0)
 
-        Clock.schedule_once(lambda dt: self.show_loading("Processing incidents..."), 0)
-        threading.Thread(target=lambda: _process_images_deferred(self), daemon=True).start()
+        Clock.schedule_once(lambda dt: self.show_loading("Checking incidents..."), 0)
+        Clock.schedule_once(lambda dt: start_export(self), 0)
 
     # ------------ UI helpers ------------
     def show_loading(self, message="Processing..."):
@@ -698,6 +788,7 @@ class SelectionScreen(BoxLayout):
             color=(0, 0, 0, 1)
         )
         label.bind(size=label.setter('text_size'))
+        self.loading_label = label
 
         layout = BoxLayout(orientation='vertical', padding=20, spacing=20)
         layout.add_widget(spinner_box)
@@ -718,6 +809,11 @@ class SelectionScreen(BoxLayout):
         self.spinner_event = Clock.schedule_interval(self.update_spinner, 0.1)
 
 
+    def update_loading(self, message):
+        """Change the text of the open loading popup (e.g. progress)."""
+        if getattr(self, "loading_popup", None) and getattr(self, "loading_label", None):
+            self.loading_label.text = message
+
     def update_spinner(self, dt):
         """Cycle through spinner frames like in video.py"""
         if not hasattr(self, "spinner_frames") or not self.spinner_frames:
@@ -752,8 +848,9 @@ class SelectionScreen(BoxLayout):
         self.device_spinner.text = "Select Device"
         self.device_spinner.values = ensure_device_mounts()
 
-        self.available_images.clear()
+        self.available_images = CameraFrames.empty()
         self.hour_label_map.clear()
+        self.chosen_incidents = None
         logger.info("UI reset to initial state")
 
 
@@ -828,16 +925,193 @@ class SelectionScreen(BoxLayout):
         return False
 
 
+class IncidentCard(RecycleDataViewBehavior, BoxLayout):
+    """
+    RecycleView row for one incident: keyframe thumbnail, times, frame count,
+    checkbox. Cards are reused while scrolling, so all state lives in the
+    RecycleView data and the thumbnail texture comes from the screen's pool.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', padding=dp(8), spacing=dp(4), **kwargs)
+        self.screen = None
+        self.index = None
+        self.keyframe = None
+        with self.canvas.before:
+            Color(1, 1, 1, 1)
+            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size, radius=[dp(12)])
+        self.bind(pos=self.update_bg, size=self.update_bg)
+
+        self.thumbnail = Image(fit_mode="contain", opacity=0)
+        self.add_widget(self.thumbnail)
+
+        self.info = Label(font_size='14sp', color=(0, 0, 0, 1), halign='left', valign='middle')
+        self.info.bind(size=self.info.setter('text_size'))
+        row = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(48))
+        self.checkbox = CheckBox(size_hint_x=None, width=dp(36), color=(0, 0, 0, 1))
+        self.checkbox.bind(active=self.on_checkbox)
+        row.add_widget(self.checkbox)
+        row.add_widget(self.info)
+        self.add_widget(row)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.screen = rv.incident_screen
+        self.index = index
+        incident = data["incident"]
+        start, end = epoch_to_ist(incident.start), epoch_to_ist(incident.end)
+        duration = int(round(incident.end - incident.start))
+        self.info.text = (f"#{incident.number}  {start.strftime('%I:%M:%S%p')} - {end.strftime('%I:%M:%S%p')}\n"
+                          f"{duration // 60}m {duration % 60:02d}s · {incident.frames} frames")
+        self.checkbox.active = data["checked"]
+        self.screen.bind_thumbnail(self, incident.keyframe)
+        return super().refresh_view_attrs(rv, index, data)
+
+    def set_texture(self, texture):
+        self.thumbnail.texture = texture
+        self.thumbnail.opacity = 1 if texture is not None else 0
+
+    def on_checkbox(self, checkbox, value):
+        if self.screen is not None and self.index is not None:
+            self.screen.set_checked(self.index, value)
+
+    def update_bg(self, *args):
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
+
+
 class IncidentScreen(BoxLayout):
-    # Keep a lightweight incidents screen in-case you want to show grouped previews.
-    def __init__(self, screen_manager, **kwargs):
+    """
+    Preview of the selected hour's incidents; only the checked ones are
+    exported. The list is a RecycleView (only visible cards exist) and
+    thumbnails are decoded off-thread into arrays, then uploaded into a
+    bounded TexturePool.
+    """
+    def __init__(self, screen_manager, selection=None, **kwargs):
         super().__init__(orientation='vertical', **kwargs)
         self.screen_manager = screen_manager
+        self.selection = selection  # SelectionScreen that opened the preview
+        self.camera = None
+        self.generation = 0   # thumbnails arriving for an older preview are dropped
+        self.texture_pool = TexturePool(TEXTURE_POOL_SIZE, (THUMB_WIDTH, THUMB_HEIGHT))
+        self.bound_cards = {}  # keyframe path → cards currently showing it
+        self.requested = set()  # keyframes being decoded
         with self.canvas.before:
             Color(*get_color_from_hex("#Adb3ad"))
             self.rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self.update_rect, size=self.update_rect)
 
+        header = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(70),
+                           padding=[dp(20), dp(10)], spacing=dp(15))
+        header.add_widget(self._make_button("BACK", self.go_back, dp(120)))
+        self.title_label = Label(text="", font_size='20sp', font_name=arial_path,
+                                 color=(0, 0, 0, 1), halign='left', valign='middle')
+        self.title_label.bind(size=self.title_label.setter('text_size'))
+        header.add_widget(self.title_label)
+        self.toggle_button = self._make_button("SELECT NONE", self.toggle_all, dp(170))
+        header.add_widget(self.toggle_button)
+        self.export_button = self._make_button("EXPORT", self.export_selected, dp(200))
+        header.add_widget(self.export_button)
+        self.add_widget(header)
+
+        self.rv = RecycleView(size_hint=(1, 1), bar_width=dp(6), scroll_type=['bars', 'content'])
+        self.rv.incident_screen = self
+        self.rv.viewclass = IncidentCard
+        grid = RecycleGridLayout(cols=4, spacing=dp(12), padding=[dp(20), dp(10)],
+                                 default_size=(None, dp(220)), default_size_hint=(1, None),
+                                 size_hint_y=None)
+        grid.bind(minimum_height=grid.setter('height'))
+        self.rv.add_widget(grid)
+        self.add_widget(self.rv)
+
+    def _make_button(self, text, on_press, width):
+        button = Button(text=text, font_size='18sp', size_hint=(None, None), size=(width, dp(50)),
+                        background_normal='', background_color=(0, 0, 0, 0), color=(0, 0, 0, 1),
+                        on_press=lambda inst: on_press())
+        with button.canvas.before:
+            Color(*get_color_from_hex("#01acee"))
+            button.bg_rect = RoundedRectangle(pos=button.pos, size=button.size, radius=[dp(15)])
+        button.bind(pos=lambda i, v: setattr(button.bg_rect, 'pos', i.pos),
+                    size=lambda i, v: setattr(button.bg_rect, 'size', i.size))
+        return button
+
+    def show_incidents(self, camera, date_str, hours):
+        """hours: [(hour label, [IncidentSummary])] of one camera and IST date."""
+        get_thumbnail_cache().cancel_pending()
+        self.generation += 1
+        self.requested.clear()
+        self.texture_pool.clear()
+        self.camera = camera
+        self.rv.data = [{"hour_label": hour_label, "incident": incident, "checked": True}
+                        for hour_label, summaries in hours for incident in summaries]
+        self.rv.scroll_y = 1
+        self.title_label.text = f"{camera}  ·  {date_str}  ·  {len(self.rv.data)} incident(s)"
+        self.update_counts()
+
+    # -- thumbnails --
+    def bind_thumbnail(self, card, keyframe):
+        """Point a (re)used card at keyframe's texture, decoding it if not pooled."""
+        if card.keyframe is not None:
+            self.bound_cards.get(card.keyframe, set()).discard(card)
+        card.keyframe = keyframe
+        self.bound_cards.setdefault(keyframe, set()).add(card)
+        texture = self.texture_pool.get(keyframe)
+        card.set_texture(texture)
+        if texture is None and keyframe not in self.requested:
+            self.requested.add(keyframe)
+            generation = self.generation
+            get_thumbnail_cache().request([keyframe], lambda path, thumb: self._decoded(
+                generation, path, thumbnail_pixels(thumb) if thumb else None))
+
+    def _decoded(self, generation, keyframe, pixels):
+        # Thumbnail worker thread: only the upload needs the UI thread
+        Clock.schedule_once(lambda dt: self._upload(generation, keyframe, pixels), 0)
+
+    def _upload(self, generation, keyframe, pixels):
+        if generation != self.generation:
+            return
+        self.requested.discard(keyframe)
+        cards = self.bound_cards.get(keyframe)
+        if pixels is None or not cards:
+            return  # scrolled away meanwhile: decoded again if it comes back
+        texture, evicted = self.texture_pool.put(keyframe, pixels)
+        for card in self.bound_cards.get(evicted, ()):
+            card.set_texture(None)
+        for card in cards:
+            card.set_texture(texture)
+
+    # -- selection --
+    def set_checked(self, index, value):
+        if index < len(self.rv.data) and self.rv.data[index]["checked"] != value:
+            self.rv.data[index]["checked"] = value
+            self.update_counts()
+
+    def update_counts(self):
+        checked = sum(item["checked"] for item in self.rv.data)
+        self.export_button.text = f"EXPORT ({checked})"
+        self.toggle_button.text = "SELECT NONE" if checked == len(self.rv.data) else "SELECT ALL"
+
+    def toggle_all(self):
+        select = not all(item["checked"] for item in self.rv.data)
+        for item in self.rv.data:
+            item["checked"] = select
+        self.rv.refresh_from_data()
+        self.update_counts()
+
+    def export_selected(self):
+        chosen = {}
+        for item in self.rv.data:
+            if item["checked"]:
+                chosen.setdefault((self.camera, item["hour_label"]), []).append(item["incident"])
+        if not chosen:
+            self.selection.show_popup("Please select at least one incident.", reset_ui=False)
+            return
+        self.go_back()
+        process_images(self.selection, chosen=chosen)
+
+    def go_back(self):
+        get_thumbnail_cache().cancel_pending()
+        self.requested.clear()
+        self.screen_manager.current = "selection"
+
     def update_rect(self, *args):
         self.rect.pos = self.pos
-        self.rect.size = self.size
\ No newline at end of file
+        self.rect.size = self.size
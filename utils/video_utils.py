@@ -1,28 +1,253 @@
-import cv2, os
-from utils.config import IST_OFFSET
+import cv2, os, json, time, tempfile, threading
+import numpy as np
+from collections import deque, namedtuple
+from datetime import timedelta
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import (
+    IST_OFFSET, DECODE_WORKERS, DECODE_QUEUE_DEPTH, EXPORT_SCALE, EXPORT_PRESET, CODEC_CACHE_PATH,
+    EXPORT_MODE
+)
 from utils.logs import logger,StderrRedirect
 from utils.file_utils import clean_camera_name
+from utils.image_index import iter_incident_ranges
+from utils.avi_writer import MjpegAviWriter, jpeg_dimensions, AVI_MAX_BYTES
+
+# ---------------------
+# Codec profiles
+# ---------------------
+CodecProfile = namedtuple("CodecProfile", "name fourcc ext")
+
+CODEC_PROFILES = {
+    "mjpg": CodecProfile("mjpg", "MJPG", ".avi"),   # fastest encode, biggest files
+    "mp4v": CodecProfile("mp4v", "mp4v", ".mp4"),   # MPEG-4 Part 2, native MP4 tag
+    "h264": CodecProfile("h264", "avc1", ".mp4"),   # smallest, if the FFmpeg build has an encoder
+}
+
+# Speed-vs-size presets: first available profile wins
+CODEC_PRESETS = {
+    "fast": ("mjpg", "mp4v", "h264"),
+    "balanced": ("mp4v", "mjpg", "h264"),
+    "small": ("h264", "mp4v", "mjpg"),
+}
+
+_available_codecs = None
+_codec_lock = threading.Lock()
+
+
+def _probe_codec(profile, folder):
+    path = os.path.join(folder, f"probe_{profile.name}{profile.ext}")
+    with StderrRedirect():
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*profile.fourcc), 5, (64, 64))
+        if not out.isOpened():
+            return False
+        frame = np.zeros((64, 64, 3), np.uint8)
+        for _ in range(3):
+            out.write(frame)
+        out.release()
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def probe_codecs(force=False):
+    """
+    Return the names of the codec profiles this OpenCV/FFmpeg build can write.
+    Probed once (tiny test file per profile) and cached in memory and in
+    CODEC_CACHE_PATH, keyed by the OpenCV version.
+    """
+    global _available_codecs
+    with _codec_lock:
+        if _available_codecs is not None and not force:
+            return _available_codecs
+        if not force:
+            try:
+                with open(CODEC_CACHE_PATH) as f:
+                    cached = json.load(f)
+                if cached.get("opencv") == cv2.__version__:
+                    _available_codecs = cached["available"]
+                    return _available_codecs
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with tempfile.TemporaryDirectory() as folder:
+            available = [name for name, profile in CODEC_PROFILES.items()
+                         if _probe_codec(profile, folder)]
+        logger.info("Available video codecs: %s", ", ".join(available) or "none")
+        try:
+            os.makedirs(os.path.dirname(CODEC_CACHE_PATH), exist_ok=True)
+            with open(CODEC_CACHE_PATH, "w") as f:
+                json.dump({"opencv": cv2.__version__, "available": available}, f)
+        except OSError as e:
+            logger.warning("Could not save codec cache: %s", e)
+        _available_codecs = available
+        return available
+
+
+def select_codec(preset=EXPORT_PRESET):
+    """Pick the codec profile for a speed-vs-size preset ("fast", "balanced", "small")."""
+    available = probe_codecs()
+    for name in CODEC_PRESETS.get(preset, CODEC_PRESETS["balanced"]):
+        if name in available:
+            return CODEC_PROFILES[name]
+    logger.warning("No probed codec available; falling back to mp4v")
+    return CODEC_PROFILES["mp4v"]
+
+
+def benchmark_codecs(image_path_and_ts, fps=5, scale=EXPORT_SCALE):
+    """
+    Encode one incident with every available profile into a temp folder.
+    Returns [(profile name, seconds, output bytes, success)], fastest first.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for name in probe_codecs():
+            profile = CODEC_PROFILES[name]
+            out_path = os.path.join(folder, f"bench_{name}{profile.ext}")
+            start = time.perf_counter()
+            ok, _ = create_video_from_image_paths(image_path_and_ts, out_path, fps=fps,
+                                                  scale=scale, codec=name)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(out_path) if os.path.exists(out_path) else 0
+            results.append((name, elapsed, size, ok))
+            logger.info("Codec benchmark %s: %.2fs, %d KB", name, elapsed, size // 1024)
+    return sorted(results, key=lambda r: r[1])
+
+
+class OverlayRenderer:
+    """
+    Camera + IST timestamp banner for one camera, composited from caches.
+
+    The "<camera> | " prefix and every timestamp character are rasterised
+    once into glyph strips; a timestamp's banner patch is assembled from
+    them (white-on-black, so strips are merged with a per-pixel max) and
+    kept for the few frames sharing that second. Per frame the overlay is
+    a single copy of the patch into the frame.
+    """
+    FONT = cv2.FONT_HERSHEY_SIMPLEX
+    MARGIN = 4           # glyph strip slack for anti-aliased strokes
+    MAX_PATCHES = 32
+
+    def __init__(self, camera_name, factor=1.0):
+        # factor < 1 shrinks the banner for reduced-resolution exports
+        self.prefix = f"{camera_name} | "
+        self.SCALE = 0.7 * factor
+        self.THICKNESS = max(1, int(round(2 * factor)))
+        self.TEXT_Y = int(round(40 * factor))  # baseline of the text in the frame
+        self.ABOVE = int(round(28 * factor))   # banner extent above the baseline
+        self.BELOW = int(round(8 * factor))    # ... and below it
+        self.PAD = int(round(8 * factor))      # banner padding left / right of the text
+        self._glyphs = {}
+        self._patches = {}
+
+    def _advance(self, text):
+        # getTextSize rounds; measuring 100 copies gives the sub-pixel advance
+        width = cv2.getTextSize(text * 100, self.FONT, self.SCALE, self.THICKNESS)[0][0]
+        return (width - self.THICKNESS) / 100.0
+
+    def _glyph(self, text):
+        glyph = self._glyphs.get(text)
+        if glyph is None:
+            advance = self._advance(text)
+            strip = np.zeros((self.ABOVE + self.BELOW + 1,
+                              int(advance) + 2 * self.MARGIN + self.THICKNESS + 2, 3), np.uint8)
+            cv2.putText(strip, text, (self.MARGIN, self.ABOVE), self.FONT, self.SCALE,
+                        (255, 255, 255), self.THICKNESS, cv2.LINE_AA)
+            glyph = (advance, strip)
+            self._glyphs[text] = glyph
+        return glyph
+
+    def patch(self, ist_str):
+        """Return (text_width, banner patch) for the timestamp string."""
+        cached = self._patches.get(ist_str)
+        if cached is not None:
+            return cached
+        glyphs = [self._glyph(self.prefix)] + [self._glyph(ch) for ch in ist_str]
+        text_w = int(round(sum(adv for adv, _ in glyphs) + self.THICKNESS))
+        patch = np.zeros((self.ABOVE + self.BELOW + 1, text_w + 2 * self.PAD + 1, 3), np.uint8)
+        x = float(self.PAD)
+        for advance, strip in glyphs:
+            x0 = int(round(x)) - self.MARGIN
+            a, b = max(x0, 0), min(x0 + strip.shape[1], patch.shape[1])
+            if b > a:
+                np.maximum(patch[:, a:b], strip[:, a - x0:b - x0], out=patch[:, a:b])
+            x += advance
+        if len(self._patches) >= self.MAX_PATCHES:
+            self._patches.clear()
+        self._patches[ist_str] = (text_w, patch)
+        return text_w, patch
+
+    def apply(self, img, ist_str):
+        """Copy the banner for ist_str into img (in place), centred at the top."""
+        text_w, patch = self.patch(ist_str)
+        height, width = img.shape[:2]
+        x0 = (width - text_w) // 2 - self.PAD
+        y0 = self.TEXT_Y - self.ABOVE
+        a, b = max(x0, 0), min(x0 + patch.shape[1], width)
+        c, d = max(y0, 0), min(y0 + patch.shape[0], height)
+        if b > a and d > c:
+            img[c:d, a:b] = patch[c - y0:d - y0, a - x0:b - x0]
+        return img
+
+
+_overlay_renderers = {}
+
+
+def get_overlay_renderer(camera_name, scale=1):
+    """Shared OverlayRenderer per camera name and export scale (glyph caches survive across incidents)."""
+    key = (camera_name, scale)
+    renderer = _overlay_renderers.get(key)
+    if renderer is None:
+        # Full-size text would not fit a 1/4 frame; don't go below half size though
+        factor = max(0.5, 1.0 / scale)
+        renderer = _overlay_renderers.setdefault(key, OverlayRenderer(camera_name, factor))
+    return renderer
+
+
+# Decode-time downscaling: libjpeg scales in the DCT domain, so a reduced
+# frame costs a fraction of a full decode (plus no cv2.resize afterwards).
+IMREAD_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def iter_prefetched(items, prepare, workers=DECODE_WORKERS, depth=DECODE_QUEUE_DEPTH):
+    """
+    Yield prepare(*item) for each item, in order, with up to `depth` items
+    being prepared ahead on a thread pool (cv2 releases the GIL while
+    decoding). Memory stays bounded by depth; closing the generator
+    cancels what has not started yet.
+    """
+    items = iter(items)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    window = deque(pool.submit(prepare, *item) for item in islice(items, depth))
+    try:
+        while window:
+            future = window.popleft()
+            nxt = next(items, None)
+            if nxt is not None:
+                window.append(pool.submit(prepare, *nxt))
+            yield future.result()
+    finally:
+        for future in window:
+            future.cancel()
+        pool.shutdown(wait=True)
 
 def group_images_by_incident(images_with_times, gap_seconds=30):
     """
     images_with_times: list of tuples (image_path, timestamp_gmt)
     Groups by time gaps: new group when gap > gap_seconds
     Returns list of groups: each group is list of (image_path, timestamp_gmt)
+    (For CameraFrames use CameraFrames.incidents(), which skips the sort.)
     """
-    groups = []
-    current = []
-    last_t = None
-    for img_path, ts in sorted(images_with_times, key=lambda x: x[1]):
-        if not last_t or (ts - last_t).total_seconds() > gap_seconds:
-            if current:
-                groups.append(current)
-            current = [(img_path, ts)]
-        else:
-            current.append((img_path, ts))
-        last_t = ts
-    if current:
-        groups.append(current)
-    return groups
+    items = sorted(images_with_times, key=lambda x: x[1])
+    if not items:
+        return []
+    # Integer microseconds keep the gap comparison exact (as timedelta arithmetic is)
+    t0, usec = items[0][1], timedelta(microseconds=1)
+    offsets = np.fromiter(((ts - t0) // usec for _, ts in items), dtype=np.int64, count=len(items))
+    return [items[lo:hi] for lo, hi in iter_incident_ranges(offsets, gap_seconds * 1e6)]
 
 # def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
 #     """
@@ -74,24 +299,33 @@ def group_images_by_incident(images_with_times, gap_seconds=30):
 
 #         out.release()
 #         return True
-def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
+def create_video_from_image_paths(image_path_and_ts, output_path, fps=5, abort_event=None,
+                                  scale=EXPORT_SCALE, codec=None):
     """
     Create a playable MP4 video from list of (image_path, timestamp).
     Ensures consistent frame size and overlays camera + IST timestamp.
+    abort_event (threading.Event) is checked between frames.
+    scale: 1 (full), 2 (half) or 4 (quarter) resolution, reduced while decoding.
+    codec: CODEC_PROFILES name; default is select_codec() for EXPORT_PRESET.
+        output_path should carry the profile's extension.
     Returns (success: bool, error_msg: str | None).
     """
+    read_flag = IMREAD_FLAGS.get(scale)
+    if read_flag is None:
+        msg = f"Unsupported export scale: {scale}"
+        logger.error(msg)
+        return False, msg
     if not image_path_and_ts:
         msg = "No images provided for video creation."
         logger.error(msg)
         return False, msg
     MIN_FILE_SIZE = 30 * 1024  # 30 KB
-    filtered_paths = [(p, ts) for p, ts in image_path_and_ts if os.path.getsize(p) >= MIN_FILE_SIZE]
-
-    if not filtered_paths:
+    # Only whether any frame is big enough matters: stop at the first one
+    if not any(os.path.getsize(p) >= MIN_FILE_SIZE for p, _ in image_path_and_ts):
         msg = "All images are below 30KB or unreadable."
         logger.error(msg)
         return False, msg
-    first_img = cv2.imread(image_path_and_ts[0][0])
+    first_img = cv2.imread(image_path_and_ts[0][0], read_flag)
     if first_img is None:
         msg = f"Unable to read first image: {image_path_and_ts[0][0]}"
         logger.error(msg)
@@ -100,7 +334,8 @@ def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
     try:
         height, width = first_img.shape[:2]
         with StderrRedirect():
-            fourcc = cv2.VideoWriter_fourcc(*'XVID')
+            profile = CODEC_PROFILES[codec] if codec else select_codec()
+            fourcc = cv2.VideoWriter_fourcc(*profile.fourcc)
             out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
             if not out.isOpened():
@@ -108,21 +343,13 @@ def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
                 logger.error(msg)
                 return False, msg
 
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.7
-            thickness = 2
-
-            for path, ts_gmt in image_path_and_ts:
-                if not out.isOpened():
-                    msg = f"Video writer closed unexpectedly while writing {output_path}"
-                    logger.error(msg)
-                    out.release()
-                    return False, "Device disconnected while saving. Videos may be incomplete."
+            def prepare(path, ts_gmt):
+                """Decode + resize + overlay one frame (runs on the reader pool)."""
                 try:
-                    img = cv2.imread(path)
+                    img = cv2.imread(path, read_flag)
                     if img is None:
                         logger.warning("Skipped unreadable image: %s", path)
-                        continue
+                        return None
 
                     if img.shape[1] != width or img.shape[0] != height:
                         img = cv2.resize(img, (width, height))
@@ -131,21 +358,29 @@ def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
                     camera_name = clean_camera_name(raw_name)
                     ist_ts = ts_gmt + IST_OFFSET
                     ist_str = ist_ts.strftime("%Y-%m-%d %I:%M:%S %p")
-                    overlay = f"{camera_name} | {ist_str}"
-
-                    (text_w, text_h), _ = cv2.getTextSize(overlay, font, font_scale, thickness)
-                    text_x = (width - text_w) // 2
-                    text_y = 40
-                    cv2.rectangle(img, (text_x - 8, text_y - 28),
-                                  (text_x + text_w + 8, text_y + 8), (0, 0, 0), -1)
-                    cv2.putText(img, overlay, (text_x, text_y),
-                                font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
-
-                    out.write(img)
-
-                except Exception as e:
+                    return get_overlay_renderer(camera_name, scale).apply(img, ist_str)
+                except Exception:
                     # log per-image exception with full traceback
                     logger.exception("Error processing image %s", path)
+                    return None
+
+            # This thread only encodes; decoding/overlay runs ahead on the pool
+            frames = iter_prefetched(image_path_and_ts, prepare)
+            try:
+                for img in frames:
+                    if abort_event is not None and abort_event.is_set():
+                        logger.warning("Aborted while writing %s", output_path)
+                        out.release()
+                        return False, "Export aborted."
+                    if not out.isOpened():
+                        msg = f"Video writer closed unexpectedly while writing {output_path}"
+                        logger.error(msg)
+                        out.release()
+                        return False, "Device disconnected while saving. Videos may be incomplete."
+                    if img is not None:
+                        out.write(img)
+            finally:
+                frames.close()
 
             out.release()
         return True, None
@@ -156,3 +391,140 @@ def create_video_from_image_paths(image_path_and_ts, output_path, fps=5):
         logger.exception(msg)
         return False, msg
 
+
+
+# ---------------------
+# Passthrough (no re-encode) export
+# ---------------------
+def _srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def write_srt(path, captions, fps):
+    """
+    Write an .srt with one caption per frame (consecutive identical captions
+    merged into one cue). captions: list of strings, in frame order.
+    """
+    cues = []
+    start = 0
+    for i in range(1, len(captions) + 1):
+        if i == len(captions) or captions[i] != captions[start]:
+            cues.append(f"{len(cues) + 1}\n{_srt_time(start / fps)} --> {_srt_time(i / fps)}\n"
+                        f"{captions[start]}\n")
+            start = i
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(cues))
+
+
+def srt_path_for(video_path):
+    return os.path.splitext(video_path)[0] + ".srt"
+
+
+def passthrough_video_from_image_paths(image_path_and_ts, output_path, fps=5, abort_event=None):
+    """
+    Mux the original JPEG bytes into an MJPEG AVI without decoding, plus a
+    <name>.srt sidecar carrying the camera + IST timestamp overlay.
+    Export speed is then bounded by disk reads/writes, not the CPU.
+    Frames that are not JPEGs or differ in size from the first are skipped.
+    Returns (success: bool, error_msg: str | None), like create_video_from_image_paths.
+    """
+    if not image_path_and_ts:
+        msg = "No images provided for video creation."
+        logger.error(msg)
+        return False, msg
+    MIN_FILE_SIZE = 30 * 1024  # 30 KB
+    if not any(os.path.getsize(p) >= MIN_FILE_SIZE for p, _ in image_path_and_ts):
+        msg = "All images are below 30KB or unreadable."
+        logger.error(msg)
+        return False, msg
+
+    def read(path, ts_gmt):
+        try:
+            with open(path, "rb") as f:
+                return path, ts_gmt, f.read()
+        except OSError as e:
+            logger.warning("Skipped unreadable image %s: %s", path, e)
+            return path, ts_gmt, None
+
+    writer = None
+    captions = []
+    frames = iter_prefetched(image_path_and_ts, read)
+    try:
+        for path, ts_gmt, data in frames:
+            if abort_event is not None and abort_event.is_set():
+                logger.warning("Aborted while writing %s", output_path)
+                if writer:
+                    writer.abort()
+                return False, "Export aborted."
+            if data is None:
+                continue
+            size = jpeg_dimensions(data)
+            if size is None:
+                logger.warning("Skipped non-JPEG frame in passthrough export: %s", path)
+                continue
+            if writer is None:
+                writer = MjpegAviWriter(output_path, fps, *size)
+            elif size != (writer.width, writer.height):
+                logger.warning("Skipped %s: %dx%d frame in a %dx%d video",
+                               path, size[0], size[1], writer.width, writer.height)
+                continue
+            writer.write(data)
+            camera_name = clean_camera_name(os.path.basename(os.path.dirname(path)))
+            ist_str = (ts_gmt + IST_OFFSET).strftime("%Y-%m-%d %I:%M:%S %p")
+            captions.append(f"{camera_name} | {ist_str}")
+    except OSError as e:
+        msg = f"Error while writing video {output_path}: {e}"
+        logger.error(msg)
+        if writer:
+            writer.abort()
+        return False, msg
+    finally:
+        frames.close()
+
+    if writer is None:
+        msg = f"No JPEG frames to write for {output_path}"
+        logger.error(msg)
+        return False, msg
+    try:
+        writer.close()
+        write_srt(srt_path_for(output_path), captions, fps)
+    except OSError as e:
+        msg = f"Error while finalizing video {output_path}: {e}"
+        logger.error(msg)
+        return False, msg
+    return True, None
+
+
+def passthrough_supported(image_path_and_ts):
+    """True if the incident fits a plain AVI (JPEG sources, under AVI_MAX_BYTES)."""
+    total = 0
+    for path, _ in image_path_and_ts:
+        if not path.lower().endswith((".jpg", ".jpeg")):
+            return False
+        total += os.path.getsize(path)
+    return total < AVI_MAX_BYTES * 0.95
+
+
+def export_video(image_path_and_ts, output_path, fps=5, abort_event=None,
+                 scale=EXPORT_SCALE, codec=None, mode=EXPORT_MODE):
+    """
+    Export one incident: "passthrough" muxes the JPEGs as-is (full resolution,
+    overlay in an .srt sidecar); "encode", or an incident passthrough cannot
+    handle, goes through create_video_from_image_paths.
+    The output extension is chosen by the caller (see export_extension).
+    """
+    if mode == "passthrough" and passthrough_supported(image_path_and_ts):
+        return passthrough_video_from_image_paths(image_path_and_ts, output_path, fps, abort_event)
+    if mode == "passthrough":
+        logger.info("Passthrough not possible for %s; encoding instead", output_path)
+        codec = "mjpg"  # keeps the .avi the caller named
+    return create_video_from_image_paths(image_path_and_ts, output_path, fps=fps,
+                                         abort_event=abort_event, scale=scale, codec=codec)
+
+
+def export_extension(codec=None, mode=EXPORT_MODE):
+    """File extension of export_video() output for this mode/codec."""
+    if mode == "passthrough":
+        return ".avi"
+    return (CODEC_PROFILES[codec] if codec else select_codec()).ext